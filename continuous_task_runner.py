@@ -5,13 +5,31 @@
 
 import json
 import time
-import subprocess
+import sys
+import argparse
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 TASKS_FILE = Path("/root/clawd/daily-tasks.json")
 PROGRESS_FILE = Path("/root/clawd/task-progress.json")
+LOG_FILE = Path("/root/clawd/logs/continuous_task_runner.log")
+
+# 共用组件位于 scripts/ 目录
+sys.path.insert(0, str(Path(__file__).resolve().parent / "scripts"))
+from task_logger import get_logger
+from retry_policy import RetryPolicy, RetryDecision, TRANSIENT, classify_error
+from file_watcher import FileWatcher
+from command_runner import run_streaming, CommandResult
+
+# 失败重试：指数退避 + 抖动，连续失败 5 次（或不可重试的错误）移入死信
+RETRY_POLICY = RetryPolicy(max_attempts=5, base_delay=30, max_delay=1800, blocked_delay=30)
+
+# 命令默认超时（秒，任务可用 "timeout" 字段覆盖）和进度中保留的输出行数
+DEFAULT_TIMEOUT = 600
+OUTPUT_TAIL_LINES = 50
+
+logger = get_logger("continuous_task_runner", str(LOG_FILE))
 
 # 任务列表
 TASKS = [
@@ -97,14 +115,15 @@ def get_next_task() -> Dict[str, Any]:
     """获取下一个待执行任务"""
     progress = load_progress()
     current_id = progress.get("current_task", "1")
+    dead_letter = progress.get("dead_letter", [])
 
     for task in TASKS:
-        if task["id"] == current_id and task["status"] != "completed":
+        if task["id"] == current_id and task["status"] != "completed" and task["id"] not in dead_letter:
             return task
 
-    # 如果当前任务已完成，找下一个
+    # 如果当前任务已完成，找下一个（死信任务跳过）
     for task in TASKS:
-        if task["status"] not in ["completed", "in_progress"]:
+        if task["status"] not in ["completed", "in_progress"] and task["id"] not in dead_letter:
             return task
 
     # 所有任务都完成了
@@ -119,38 +138,66 @@ def execute_task(task: Dict[str, Any]) -> bool:
     print(f"🔧 状态: {task['status']}")
     print(f"{'='*60}\n")
 
+    logger.info("开始执行任务", task_id=task["id"], name=task["name"], command=task["command"])
+
     # 检查是否需要用户输入
     if task["requires_user_input"]:
+        task["error_class"] = classify_error(requires_user_input=True)
+        logger.warning("任务需要用户输入", task_id=task["id"], notes=task["notes"])
         print(f"⚠️  此任务需要用户输入:")
         print(f"   {task['notes']}")
         print("\n请提供所需输入后重试，或手动执行:")
         print(f"   {task['command']}\n")
         return False
 
-    # 执行命令
+    # 执行命令：输出逐行打印并写入日志，内存中只保留最后 OUTPUT_TAIL_LINES 行
+    timeout = task.get("timeout", DEFAULT_TIMEOUT)
+
+    def on_line(line: str):
+        print(line)
+        logger.info("命令输出", task_id=task["id"], line=line)
+
     try:
-        result = subprocess.run(
-            task["command"],
-            shell=True,
-            capture_output=True,
-            text=True,
-            timeout=600  # 10 分钟超时
-        )
-
-        print(result.stdout)
-        if result.stderr:
-            print("❌ 错误输出:")
-            print(result.stderr)
-
-        return result.returncode == 0
-
-    except subprocess.TimeoutExpired:
-        print("⏰ 任务超时（10分钟）")
-        return False
+        result = run_streaming(task["command"], timeout=timeout, on_line=on_line,
+                               tail_lines=OUTPUT_TAIL_LINES)
     except Exception as e:
+        task["error_class"] = classify_error(e)
+        logger.error("任务执行失败", task_id=task["id"], error=str(e))
         print(f"❌ 执行失败: {e}")
         return False
 
+    save_output_tail(task["id"], result)
+
+    if result.timed_out:
+        task["error_class"] = classify_error(timed_out=True)
+        logger.error("任务超时", task_id=task["id"], timeout=timeout)
+        print(f"⏰ 任务超时（{timeout} 秒）")
+        return False
+
+    logger.log(
+        "任务命令结束",
+        "INFO" if result.returncode == 0 else "ERROR",
+        task_id=task["id"],
+        returncode=result.returncode,
+        duration=round(result.duration, 3),
+        lines=result.line_count
+    )
+    if result.returncode != 0:
+        task["error_class"] = classify_error(returncode=result.returncode)
+    return result.returncode == 0
+
+
+def save_output_tail(task_id: str, result: CommandResult):
+    """把最后若干行输出记入进度，供查看状态使用"""
+    progress = load_progress()
+    progress.setdefault("last_output", {})[task_id] = {
+        "returncode": result.returncode,
+        "timed_out": result.timed_out,
+        "lines": result.line_count,
+        "tail": result.tail
+    }
+    save_progress(progress)
+
 
 def update_task_status(task_id: str, status: str, notes: str = ""):
     """更新任务状态"""
@@ -180,6 +227,32 @@ def update_task_status(task_id: str, status: str, notes: str = ""):
     progress["attempts"][task_id] += 1
 
     save_progress(progress)
+    logger.info("任务状态更新", task_id=task_id, status=status, attempts=progress["attempts"][task_id])
+
+
+def record_failure(task: Dict[str, Any]) -> RetryDecision:
+    """记录一次失败并按重试策略决定：退避后重试，或移入死信不再执行"""
+    progress = load_progress()
+    failures = progress.setdefault("failures", {})
+    failures[task["id"]] = failures.get(task["id"], 0) + 1
+    decision = RETRY_POLICY.decide(failures[task["id"]], task.get("error_class", TRANSIENT))
+
+    if decision.dead_letter:
+        dead_letter = progress.setdefault("dead_letter", [])
+        if task["id"] not in dead_letter:
+            dead_letter.append(task["id"])
+    save_progress(progress)
+
+    logger.log(
+        "任务失败",
+        "ERROR" if decision.dead_letter else "WARNING",
+        task_id=task["id"],
+        failures=failures[task["id"]],
+        error_class=decision.error_class,
+        retry_delay=decision.delay,
+        dead_letter=decision.dead_letter
+    )
+    return decision
 
 
 def print_status():
@@ -203,8 +276,66 @@ def print_status():
         print()
 
 
+def load_tasks_file(path: Path) -> List[Dict[str, Any]]:
+    """从任务文件读取任务列表（{"tasks": [...]} 或直接是数组），缺省字段补默认值"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    tasks = data.get("tasks", []) if isinstance(data, dict) else data
+
+    for task in tasks:
+        task["id"] = str(task["id"])
+        task.setdefault("description", "")
+        task.setdefault("steps", [])
+        task.setdefault("status", "pending")
+        task.setdefault("requires_user_input", False)
+        task.setdefault("notes", "")
+    return tasks
+
+
+def reload_tasks() -> bool:
+    """重新读取 TASKS_FILE 替换任务列表，文件缺失或格式错误时保留原列表"""
+    try:
+        tasks = load_tasks_file(TASKS_FILE)
+    except (OSError, ValueError, KeyError) as e:
+        logger.error("任务文件读取失败", path=str(TASKS_FILE), error=str(e))
+        print(f"❌ 任务文件读取失败: {e}")
+        return False
+
+    TASKS[:] = tasks
+    # 已完成的任务保持完成状态
+    completed = load_progress().get("completed_tasks", [])
+    for task in TASKS:
+        if task["id"] in completed:
+            task["status"] = "completed"
+
+    logger.info("已加载任务文件", path=str(TASKS_FILE), tasks=len(TASKS))
+    return True
+
+
+def wait_for_retry(watcher: Optional[FileWatcher], delay: float):
+    """等待重试：监听模式下任务文件一有变化（如去掉 requires_user_input）立即唤醒"""
+    if watcher is None:
+        time.sleep(delay)
+        return
+    if watcher.wait(delay):
+        print("📝 任务文件已更新，重新加载")
+        reload_tasks()
+
+
 def main():
     """主循环"""
+    parser = argparse.ArgumentParser(description="持续任务执行器")
+    parser.add_argument("--watch", action="store_true",
+                        help=f"从 {TASKS_FILE} 读取任务并监听文件变化，变化时立即唤醒而不是等待重试间隔")
+    args = parser.parse_args()
+
+    watcher = None
+    if args.watch:
+        if not reload_tasks():
+            return
+        watcher = FileWatcher([TASKS_FILE])
+        logger.info("监听任务文件", path=str(TASKS_FILE), inotify=watcher.uses_inotify)
+
     print("\n" + "="*60)
     print("🔄 持续任务执行器")
     print("自动循环执行任务直到完成")
@@ -227,7 +358,13 @@ def main():
             print("\n" + "="*60)
             print("🎉 所有任务已完成！")
             print("="*60 + "\n")
-            break
+            if watcher is None:
+                break
+            # 监听模式：等待任务文件加入新任务
+            print("👀 等待任务文件更新...")
+            watcher.wait()
+            reload_tasks()
+            continue
 
         # 执行任务
         task["status"] = "in_progress"
@@ -241,13 +378,21 @@ def main():
             update_task_status(task["id"], "completed")
             print(f"\n✅ 任务 {task['id']} 完成！\n")
         else:
+            decision = record_failure(task)
+            if decision.dead_letter:
+                task["status"] = "failed"
+                task["notes"] = f"连续失败（{decision.error_class}），已移入死信，需要人工处理"
+                update_task_status(task["id"], "failed")
+                print(f"\n❌ 任务 {task['id']} 已移入死信，不再自动重试\n")
+                continue
+
             task["status"] = "blocked"
             task["notes"] = f"执行失败，需要检查"
             update_task_status(task["id"], "blocked")
-            print(f"\n⚠️  任务 {task['id']} 被阻塞，将在下次循环重试\n")
+            print(f"\n⚠️  任务 {task['id']} 被阻塞，{decision.delay:.0f} 秒后重试\n")
 
-            # 如果是阻塞状态，等待一段时间后重试
-            time.sleep(30)  # 等待 30 秒
+            # 按退避时间等待后重试
+            wait_for_retry(watcher, decision.delay)
 
     if cycle >= max_cycles:
         print(f"\n⚠️  达到最大循环次数 ({max_cycles})")
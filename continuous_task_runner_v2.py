@@ -5,17 +5,44 @@
 
 import json
 import time
-import subprocess
 import sys
+import signal
+import threading
+from collections import deque
+import argparse
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 # 强制立即刷新输出
 sys.stdout.reconfigure(line_buffering=True)
 
 TASKS_FILE = Path("/root/clawd/daily-tasks.json")
 PROGRESS_FILE = Path("/root/clawd/task-progress.json")
+LOG_FILE = Path("/root/clawd/logs/continuous_task_runner_v2.log")
+
+# 共用组件位于 scripts/ 目录
+sys.path.insert(0, str(Path(__file__).resolve().parent / "scripts"))
+from task_logger import get_logger
+from retry_policy import RetryPolicy, RetryDecision, TRANSIENT, classify_error
+from file_watcher import FileWatcher
+from command_runner import run_streaming, CommandResult
+from progress_store import ProgressStore
+from status_server import StatusServer
+
+# 失败重试：指数退避 + 抖动，连续失败 5 次（或不可重试的错误）移入死信
+RETRY_POLICY = RetryPolicy(max_attempts=5, base_delay=30, max_delay=1800, blocked_delay=30)
+
+# 命令默认超时（秒，任务可用 "timeout" 字段覆盖）和进度中保留的输出行数
+DEFAULT_TIMEOUT = 60
+OUTPUT_TAIL_LINES = 50
+
+logger = get_logger("continuous_task_runner_v2", str(LOG_FILE))
+
+# 执行中的任务及其最近输出（内存中，供状态接口读取）
+IN_FLIGHT: Dict[str, Dict[str, Any]] = {}
+LIVE_OUTPUT: Dict[str, "deque[str]"] = {}
+STARTED_AT = datetime.now().isoformat()
 
 # 任务配置
 TASKS = [
@@ -67,92 +94,227 @@ def print_flush(text: str):
     print(text, flush=True)
 
 
-def load_progress() -> Dict[str, Any]:
-    """加载任务进度"""
-    if PROGRESS_FILE.exists():
-        with open(PROGRESS_FILE, 'r') as f:
-            return json.load(f)
+def default_progress() -> Dict[str, Any]:
+    """进度文件不存在时的初始进度"""
     return {"current_task": "1", "completed_tasks": [], "last_run": None, "attempts": {}}
 
 
-def save_progress(progress: Dict[str, Any]):
-    """保存任务进度"""
-    with open(PROGRESS_FILE, 'w') as f:
-        json.dump(progress, f, indent=2)
+# 进度保存在内存中，修改批量原子写回（带文件锁，多个执行器共享同一文件也安全）
+PROGRESS = ProgressStore(PROGRESS_FILE, default_progress)
+
+
+def load_progress() -> Dict[str, Any]:
+    """当前任务进度（内存模型；其他执行器写过文件时才重新读取）"""
+    PROGRESS.refresh()
+    return PROGRESS.state
 
 
 def get_next_task() -> Dict[str, Any]:
     """获取下一个待执行任务"""
     progress = load_progress()
     completed = progress.get("completed_tasks", [])
+    dead_letter = progress.get("dead_letter", [])
 
-    # 找第一个未完成的任务
+    # 找第一个未完成且未进入死信的任务
     for task in TASKS:
-        if task["id"] not in completed:
+        if task["id"] not in completed and task["id"] not in dead_letter:
             return task
 
     # 所有任务都完成了
     return None
 
 
-def execute_task(task: Dict[str, Any]) -> bool:
-    """执行任务"""
-    print_flush(f"\n{'='*60}")
-    print_flush(f"🎯 执行任务: {task['name']}")
-    print_flush(f"📝 描述: {task['description']}")
-    print_flush(f"🔧 状态: {task['status']}")
-    print_flush(f"{'='*60}\n")
+def execute_task(task: Dict[str, Any], prefix: str = "") -> bool:
+    """执行任务（prefix 加在每行输出前，并发执行时用于区分任务）"""
+    def say(text: str):
+        for line in text.split("\n"):
+            print_flush(f"{prefix}{line}" if line else "")
+
+    say(f"\n{'='*60}")
+    say(f"🎯 执行任务: {task['name']}")
+    say(f"📝 描述: {task['description']}")
+    say(f"🔧 状态: {task['status']}")
+    say(f"{'='*60}\n")
+
+    logger.info("开始执行任务", task_id=task["id"], name=task["name"], command=task["command"])
 
     # 检查是否需要用户输入
     if task["requires_user_input"]:
-        print_flush(f"⚠️  此任务需要用户输入:")
-        print_flush(f"   {task['notes']}")
-        print_flush("\n请提供所需输入后重试，或手动执行:")
-        print_flush(f"   {task['command']}\n")
+        task["error_class"] = classify_error(requires_user_input=True)
+        logger.warning("任务需要用户输入", task_id=task["id"], notes=task["notes"])
+        say(f"⚠️  此任务需要用户输入:")
+        say(f"   {task['notes']}")
+        say("\n请提供所需输入后重试，或手动执行:")
+        say(f"   {task['command']}\n")
         return False
 
-    # 执行命令
-    print_flush(f"执行命令: {task['command']}\n")
+    # 执行命令：输出逐行打印并写入日志，内存中只保留最后 OUTPUT_TAIL_LINES 行
+    say(f"执行命令: {task['command']}\n")
+    timeout = task.get("timeout", DEFAULT_TIMEOUT)
+
+    live_output = LIVE_OUTPUT[task["id"]] = deque(maxlen=OUTPUT_TAIL_LINES)
+
+    def on_line(line: str):
+        print_flush(f"{prefix}{line}")
+        live_output.append(line)
+        logger.info("命令输出", task_id=task["id"], line=line)
+
+    IN_FLIGHT[task["id"]] = {
+        "name": task["name"],
+        "worker": threading.current_thread().name,
+        "command": task["command"],
+        "started_at": datetime.now().isoformat(),
+        "timeout": timeout
+    }
     try:
-        result = subprocess.run(
-            task["command"],
-            shell=True,
-            capture_output=True,
-            text=True,
-            timeout=60
-        )
-        print_flush(result.stdout)
-        if result.stderr:
-            print_flush("❌ 错误输出:")
-            print_flush(result.stderr)
-        return result.returncode == 0
-    except subprocess.TimeoutExpired:
-        print_flush("⏰ 任务超时")
-        return False
+        result = run_streaming(task["command"], timeout=timeout, on_line=on_line,
+                               tail_lines=OUTPUT_TAIL_LINES)
     except Exception as e:
-        print_flush(f"❌ 执行失败: {e}")
+        task["error_class"] = classify_error(e)
+        logger.error("任务执行失败", task_id=task["id"], error=str(e))
+        say(f"❌ 执行失败: {e}")
         return False
 
+    finally:
+        IN_FLIGHT.pop(task["id"], None)
+
+    save_output_tail(task["id"], result)
+
+    if result.timed_out:
+        task["error_class"] = classify_error(timed_out=True)
+        logger.error("任务超时", task_id=task["id"], timeout=timeout)
+        say(f"⏰ 任务超时（{timeout} 秒）")
+        return False
+
+    logger.log(
+        "任务命令结束",
+        "INFO" if result.returncode == 0 else "ERROR",
+        task_id=task["id"],
+        returncode=result.returncode,
+        duration=round(result.duration, 3),
+        lines=result.line_count
+    )
+    if result.returncode != 0:
+        task["error_class"] = classify_error(returncode=result.returncode)
+    return result.returncode == 0
+
+
+def save_output_tail(task_id: str, result: CommandResult):
+    """把最后若干行输出记入进度，供查看状态使用"""
+    record = {
+        "returncode": result.returncode,
+        "timed_out": result.timed_out,
+        "lines": result.line_count,
+        "tail": result.tail
+    }
+
+    def apply(progress: Dict[str, Any]):
+        progress.setdefault("last_output", {})[task_id] = record
+
+    PROGRESS.update(apply)
+
 
 def update_task_status(task_id: str, status: str, notes: str = ""):
     """更新任务状态"""
-    progress = load_progress()
+    now = datetime.now().isoformat()
 
-    if status == "completed":
-        if task_id not in progress["completed_tasks"]:
-            progress["completed_tasks"].append(task_id)
+    def apply(progress: Dict[str, Any]) -> int:
+        if status == "completed":
+            completed = progress.setdefault("completed_tasks", [])
+            if task_id not in completed:
+                completed.append(task_id)
 
-    progress["last_run"] = datetime.now().isoformat()
+        progress["last_run"] = now
 
-    # 记录尝试次数
-    if task_id not in progress["attempts"]:
-        progress["attempts"][task_id] = 0
-    progress["attempts"][task_id] += 1
+        # 记录尝试次数
+        attempts = progress.setdefault("attempts", {})
+        attempts[task_id] = attempts.get(task_id, 0) + 1
+        return attempts[task_id]
 
-    save_progress(progress)
+    # 完成状态立即写回，其他状态按间隔批量写回
+    attempts = PROGRESS.update(apply, flush=(status == "completed"))
+    logger.info("任务状态更新", task_id=task_id, status=status, attempts=attempts)
     print_flush(f"💾 已保存进度 - 任务 {task_id}: {status}")
 
 
+def record_failure(task: Dict[str, Any]) -> RetryDecision:
+    """记录一次失败并按重试策略决定：退避后重试，或移入死信不再执行"""
+    task_id = task["id"]
+
+    def count_failure(progress: Dict[str, Any]) -> int:
+        failures = progress.setdefault("failures", {})
+        failures[task_id] = failures.get(task_id, 0) + 1
+        return failures[task_id]
+
+    def add_dead_letter(progress: Dict[str, Any]):
+        dead_letter = progress.setdefault("dead_letter", [])
+        if task_id not in dead_letter:
+            dead_letter.append(task_id)
+
+    failures = PROGRESS.update(count_failure)
+    decision = RETRY_POLICY.decide(failures, task.get("error_class", TRANSIENT))
+    if decision.dead_letter:
+        PROGRESS.update(add_dead_letter, flush=True)
+
+    logger.log(
+        "任务失败",
+        "ERROR" if decision.dead_letter else "WARNING",
+        task_id=task_id,
+        failures=failures,
+        error_class=decision.error_class,
+        retry_delay=decision.delay,
+        dead_letter=decision.dead_letter
+    )
+    return decision
+
+
+def status_snapshot() -> Dict[str, Any]:
+    """状态接口返回的内容：全部来自内存，不读进度文件"""
+    progress = PROGRESS.snapshot()
+    completed = progress.get("completed_tasks", [])
+    dead_letter = progress.get("dead_letter", [])
+    attempts = progress.get("attempts", {})
+    failures = progress.get("failures", {})
+    last_output = progress.get("last_output", {})
+
+    tasks = []
+    for task in list(TASKS):
+        task_id = task["id"]
+        if task_id in IN_FLIGHT:
+            status = "running"
+        elif task_id in completed:
+            status = "completed"
+        elif task_id in dead_letter:
+            status = "dead_letter"
+        elif task["requires_user_input"]:
+            status = "waiting_user_input"
+        else:
+            status = task.get("status", "pending")
+        tasks.append({
+            "id": task_id,
+            "name": task["name"],
+            "status": status,
+            "attempts": attempts.get(task_id, 0),
+            "failures": failures.get(task_id, 0),
+            "notes": task.get("notes", ""),
+            "last_output": last_output.get(task_id)
+        })
+
+    return {
+        "time": datetime.now().isoformat(),
+        "started_at": STARTED_AT,
+        "last_run": progress.get("last_run"),
+        "total": len(tasks),
+        "completed": len(completed),
+        "dead_letter": dead_letter,
+        "in_flight": [
+            dict(info, id=task_id, output=list(LIVE_OUTPUT.get(task_id, ())))
+            for task_id, info in list(IN_FLIGHT.items())
+        ],
+        "tasks": tasks
+    }
+
+
 def print_status():
     """打印当前状态"""
     print_flush(f"\n{'='*60}")
@@ -166,6 +328,9 @@ def print_status():
         if task["id"] in completed:
             status_icon = "✅"
             status_text = "已完成"
+        elif task["id"] in progress.get("dead_letter", []):
+            status_icon = "❌"
+            status_text = "死信（需人工处理）"
         elif task["requires_user_input"]:
             status_icon = "🔑"
             status_text = "需用户输入"
@@ -180,13 +345,205 @@ def print_status():
         print_flush("")
 
 
+def load_tasks_file(path: Path) -> List[Dict[str, Any]]:
+    """从任务文件读取任务列表（{"tasks": [...]} 或直接是数组），缺省字段补默认值"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    tasks = data.get("tasks", []) if isinstance(data, dict) else data
+
+    for task in tasks:
+        task["id"] = str(task["id"])
+        task.setdefault("description", "")
+        task.setdefault("steps", [])
+        task.setdefault("status", "pending")
+        task.setdefault("requires_user_input", False)
+        task.setdefault("notes", "")
+    return tasks
+
+
+def reload_tasks() -> bool:
+    """重新读取 TASKS_FILE 替换任务列表，文件缺失或格式错误时保留原列表"""
+    try:
+        tasks = load_tasks_file(TASKS_FILE)
+    except (OSError, ValueError, KeyError) as e:
+        logger.error("任务文件读取失败", path=str(TASKS_FILE), error=str(e))
+        print_flush(f"❌ 任务文件读取失败: {e}")
+        return False
+
+    TASKS[:] = tasks
+    logger.info("已加载任务文件", path=str(TASKS_FILE), tasks=len(TASKS))
+    return True
+
+
+def wait_for_retry(watcher: Optional[FileWatcher], delay: float):
+    """等待重试：监听模式下任务文件一有变化（如去掉 requires_user_input）立即唤醒"""
+    if watcher is None:
+        time.sleep(delay)
+        return
+    if watcher.wait(delay):
+        print_flush("📝 任务文件已更新，重新加载")
+        reload_tasks()
+
+
+class WorkerPool:
+    """
+    并发执行模式：N 个 worker 线程从 TASKS 中领取互不依赖的任务并行执行，
+    没有可执行任务时退出（监听模式下等待任务文件更新）；
+    需要用户输入的任务不领取，失败的任务在退避时间到达前不领取
+    """
+
+    def __init__(self, workers: int, watcher: Optional[FileWatcher] = None):
+        self.workers = workers
+        self.watcher = watcher
+        self.condition = threading.Condition()
+        self.in_flight: Dict[str, str] = {}     # 任务 id -> worker 名称
+        self.retry_at: Dict[str, float] = {}    # 任务 id -> 可重试的时间（monotonic）
+        self.stopping = threading.Event()
+
+    def _runnable(self, task: Dict[str, Any], progress: Dict[str, Any]) -> bool:
+        return (
+            task["id"] not in progress.get("completed_tasks", [])
+            and task["id"] not in progress.get("dead_letter", [])
+            and task["id"] not in self.in_flight
+            and not task["requires_user_input"]
+        )
+
+    def _claim(self, worker: str):
+        """在锁内选择任务：返回 (任务, None)，或 (None, 需要等待的秒数)；两者都为 None 表示已空闲"""
+        progress = load_progress()
+        now = time.monotonic()
+        next_retry = None
+        for task in TASKS:
+            if not self._runnable(task, progress):
+                continue
+            retry_at = self.retry_at.get(task["id"], 0)
+            if retry_at > now:
+                next_retry = retry_at - now if next_retry is None else min(next_retry, retry_at - now)
+                continue
+            self.in_flight[task["id"]] = worker
+            self.retry_at.pop(task["id"], None)
+            return task, None
+
+        if next_retry is not None or self.in_flight or self.watcher is not None:
+            return None, next_retry
+        return None, None
+
+    def _worker(self, worker: str):
+        while not self.stopping.is_set():
+            with self.condition:
+                task, wait = self._claim(worker)
+                if task is None:
+                    if wait is None and not self.in_flight and self.watcher is None:
+                        # 没有可执行、执行中或等待重试的任务
+                        self.condition.notify_all()
+                        return
+                    self.condition.wait(timeout=wait)
+                    continue
+
+            self._run(worker, task)
+
+            with self.condition:
+                self.in_flight.pop(task["id"], None)
+                self.condition.notify_all()
+
+    def _run(self, worker: str, task: Dict[str, Any]):
+        task["status"] = "in_progress"
+        print_flush(f"🔄 [{worker}] 开始执行任务 {task['id']}...")
+        logger.info("worker 领取任务", worker=worker, task_id=task["id"])
+
+        if execute_task(task, prefix=f"[任务 {task['id']}] "):
+            task["status"] = "completed"
+            task["notes"] = f"✅ 于 {datetime.now().strftime('%H:%M:%S')} 完成"
+            update_task_status(task["id"], "completed", task["notes"])
+            print_flush(f"✅ [{worker}] 任务 {task['id']} 完成！")
+            return
+
+        task["status"] = "blocked"
+        decision = record_failure(task)
+        if decision.dead_letter:
+            update_task_status(task["id"], "failed")
+            print_flush(f"❌ [{worker}] 任务 {task['id']} 已移入死信（{decision.error_class}）")
+            return
+        update_task_status(task["id"], "blocked")
+        with self.condition:
+            self.retry_at[task["id"]] = time.monotonic() + decision.delay
+        print_flush(f"⚠️  [{worker}] 任务 {task['id']} 失败，{decision.delay:.0f} 秒后重试")
+
+    def stop(self, *_):
+        """不再领取新任务，等待执行中的任务结束"""
+        if not self.stopping.is_set():
+            print_flush(f"\n🛑 正在停止：等待 {len(self.in_flight)} 个执行中的任务完成...")
+            logger.info("worker 池停止", in_flight=list(self.in_flight))
+        self.stopping.set()
+        with self.condition:
+            self.condition.notify_all()
+
+    def run(self):
+        threads = [
+            threading.Thread(target=self._worker, args=(f"worker-{i}",), name=f"worker-{i}")
+            for i in range(1, self.workers + 1)
+        ]
+        for thread in threads:
+            thread.start()
+
+        # 主线程负责监听任务文件和响应信号；子线程全部退出即结束
+        while any(thread.is_alive() for thread in threads):
+            if self.watcher is not None and not self.stopping.is_set():
+                if self.watcher.wait(0.5):
+                    print_flush("📝 任务文件已更新，重新加载")
+                    with self.condition:
+                        reload_tasks()
+                        self.condition.notify_all()
+            else:
+                for thread in threads:
+                    thread.join(timeout=0.5)
+
+        PROGRESS.flush()
+        waiting = [task["id"] for task in TASKS if task["requires_user_input"]
+                   and task["id"] not in load_progress().get("completed_tasks", [])]
+        if waiting:
+            print_flush(f"🔑 等待用户输入的任务: {', '.join(waiting)}")
+
+
 def main():
     """主循环"""
+    parser = argparse.ArgumentParser(description="持续任务执行器")
+    parser.add_argument("--watch", action="store_true",
+                        help=f"从 {TASKS_FILE} 读取任务并监听文件变化，变化时立即唤醒而不是等待重试间隔")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="并发 worker 数；指定后并行执行任务直到没有可执行的任务（Ctrl+C 等待执行中的任务结束后退出）")
+    parser.add_argument("--status-port", type=int,
+                        help="在该端口提供 HTTP 状态接口（GET /status），并且不再每个循环打印状态")
+    parser.add_argument("--status-host", default="127.0.0.1", help="状态接口监听地址")
+    args = parser.parse_args()
+
+    status_server = None
+    if args.status_port is not None:
+        status_server = StatusServer(status_snapshot, args.status_port, args.status_host).start()
+        print_flush(f"📡 状态接口: {status_server.address}/status")
+        logger.info("状态接口已启动", address=status_server.address)
+
+    watcher = None
+    if args.watch:
+        if not reload_tasks():
+            return
+        watcher = FileWatcher([TASKS_FILE])
+        logger.info("监听任务文件", path=str(TASKS_FILE), inotify=watcher.uses_inotify)
+
     print_flush("\n" + "="*60)
     print_flush("🔄 改进版持续任务执行器")
     print_flush("自动循环执行任务直到完成")
     print_flush("="*60 + "\n")
 
+    if args.workers > 0:
+        print_status()
+        pool = WorkerPool(args.workers, watcher)
+        signal.signal(signal.SIGINT, pool.stop)
+        signal.signal(signal.SIGTERM, pool.stop)
+        pool.run()
+        print_status()
+        return
+
     max_cycles = 100
     cycle = 0
 
@@ -195,8 +552,9 @@ def main():
         print_flush(f"\n📌 循环 {cycle}/{max_cycles}")
         print_flush(f"⏰ 时间: {datetime.now().strftime('%H:%M:%S')}")
 
-        # 打印状态
-        print_status()
+        # 打印状态（有状态接口时通过接口查看）
+        if status_server is None:
+            print_status()
 
         # 获取下一个任务
         task = get_next_task()
@@ -205,7 +563,14 @@ def main():
             print_flush("\n" + "="*60)
             print_flush("🎉 所有任务已完成！")
             print_flush("="*60 + "\n")
-            break
+            if watcher is None:
+                break
+            # 监听模式：等待任务文件加入新任务
+            PROGRESS.flush()
+            print_flush("👀 等待任务文件更新...")
+            watcher.wait()
+            reload_tasks()
+            continue
 
         # 执行任务
         task["status"] = "in_progress"
@@ -222,11 +587,18 @@ def main():
             time.sleep(2)
         else:
             task["status"] = "blocked"
+            decision = record_failure(task)
+            if decision.dead_letter:
+                update_task_status(task["id"], "failed")
+                print_flush(f"\n❌ 任务 {task['id']} 已移入死信（{decision.error_class}），不再自动重试\n")
+                continue
             update_task_status(task["id"], "blocked")
-            print_flush(f"\n⚠️  任务 {task['id']} 被阻塞，30 秒后重试\n")
-            # 等待 30 秒后重试
-            time.sleep(30)
+            print_flush(f"\n⚠️  任务 {task['id']} 被阻塞，{decision.delay:.0f} 秒后重试\n")
+            # 等待前把进度写回，再按退避时间等待后重试
+            PROGRESS.flush()
+            wait_for_retry(watcher, decision.delay)
 
+    PROGRESS.flush()
     if cycle >= max_cycles:
         print_flush(f"\n⚠️  达到最大循环次数 ({max_cycles})")
 
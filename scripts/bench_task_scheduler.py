@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+TaskScheduler 规模基准
+生成 1k ~ 1M 个任务的合成任务目录（随机前置依赖 DAG、空命令），测量：
+加载（流式解析 JSON Lines 目录）、按 id 查找、取下一个任务、进度统计、
+状态持久化（日志追加/压缩/重放）以及共享队列领取，可与上次保存的基线比较，发现扩展性退化
+"""
+
+import os
+import sys
+import time
+import json
+import random
+import shutil
+import argparse
+import tempfile
+from typing import Dict, List, Any, Optional
+
+from task_scheduler import TaskScheduler
+from task_queue import TaskQueue
+
+CATEGORIES = ["基础", "智能合约", "优化", "安全", "Layer2", "DeFi"]
+DIFFICULTIES = ["初级", "中级", "高级"]
+LEGACY_MAX_TASKS = 20000  # 旧进度统计是 O(n²)，更大规模跑不完
+SAMPLE = 1000             # 逐个操作类指标的采样次数
+
+
+def make_tasks(count: int, max_prereqs: int = 3, seed: int = 42) -> List[Dict[str, Any]]:
+    """生成合成任务：每个任务随机依赖至多 max_prereqs 个更早的任务，构成 DAG"""
+    rng = random.Random(seed)
+    tasks = []
+    for i in range(1, count + 1):
+        prereqs = set()
+        if i > 1:
+            for _ in range(rng.randint(0, max_prereqs)):
+                prereqs.add(rng.randint(max(1, i - 100), i - 1))
+        tasks.append({
+            "id": i,
+            "title": f"合成任务 {i}",
+            "category": CATEGORIES[i % len(CATEGORIES)],
+            "estimated_time": "30分钟",
+            "difficulty": DIFFICULTIES[i % len(DIFFICULTIES)],
+            "description": "benchmark",
+            "commands": [],
+            "prerequisites": [f"任务{p}" for p in sorted(prereqs)]
+        })
+    return tasks
+
+
+def legacy_category_progress(state: Dict[str, Any]) -> Dict[str, Dict[str, int]]:
+    """原 print_progress 的分类统计逻辑（list 成员判断）"""
+    categories = {}
+    for task in state["tasks"]:
+        category = task["category"]
+        if category not in categories:
+            categories[category] = {"total": 0, "completed": 0}
+        categories[category]["total"] += 1
+        if task["id"] in state["completed_tasks"]:
+            categories[category]["completed"] += 1
+    return categories
+
+
+def per_call_ms(func, repeat: int) -> float:
+    """单次调用的平均耗时（毫秒）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def elapsed_ms(func) -> float:
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000
+
+
+def new_scheduler(work_dir: str, name: str) -> TaskScheduler:
+    return TaskScheduler(
+        tasks_file=os.path.join(work_dir, f"{name}.json"),
+        journal_file=os.path.join(work_dir, f"{name}.journal"),
+        log_file=os.path.join(work_dir, "bench.log"),
+        workspace_dir=work_dir,
+        trace_file=None,
+        console_log=False
+    )
+
+
+def bench_size(count: int, work_dir: str, with_queue: bool, legacy: bool) -> Dict[str, Any]:
+    """对一个规模的合成目录跑全部指标"""
+    name = f"tasks_{count}"
+    tasks = make_tasks(count)
+    catalog_file = os.path.join(work_dir, f"{name}.jsonl")
+    with open(catalog_file, 'w', encoding='utf-8') as f:
+        for task in tasks:
+            f.write(json.dumps(task, ensure_ascii=False) + "\n")
+
+    state = {
+        "catalogs": [catalog_file],
+        "current_task_index": 0,
+        "last_update": None,
+        "completed_tasks": [task["id"] for task in tasks if task["id"] % 2 == 0]
+    }
+    with open(os.path.join(work_dir, f"{name}.json"), 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+
+    result: Dict[str, Any] = {"tasks": count}
+
+    # 加载：只读快照和日志（任务目录与进度索引都是首次使用时才建立）
+    holder = {}
+    result["load_ms"] = elapsed_ms(lambda: holder.update(s=new_scheduler(work_dir, name)))
+    scheduler = holder["s"]
+
+    # 首次访问：解析任务目录 + 建立进度索引，单独计时，不摊进后面的逐次调用
+    def first_access():
+        len(scheduler.catalog)
+        scheduler._build_progress_index()
+
+    result["first_access_ms"] = elapsed_ms(first_access)
+
+    # 按 id 查找
+    ids = random.Random(3).sample(range(1, count + 1), min(SAMPLE, count))
+    lookups = iter(ids)
+    result["get_task_ms"] = per_call_ms(lambda: scheduler.get_task(next(lookups)), len(ids))
+
+    # 取下一个任务
+    sample = min(SAMPLE, count)
+
+    def next_task():
+        scheduler.get_next_task()
+        scheduler.current_task_index += 1
+
+    result["next_task_ms"] = per_call_ms(next_task, sample)
+
+    # 进度统计
+    result["get_progress_ms"] = per_call_ms(scheduler.get_progress, SAMPLE)
+    if legacy and count <= LEGACY_MAX_TASKS:
+        legacy_state = {"tasks": tasks, "completed_tasks": state["completed_tasks"]}
+        result["legacy_progress_ms"] = elapsed_ms(lambda: legacy_category_progress(legacy_state))
+
+    # 持久化：完成事件追加（含摊还的压缩）、全量压缩、带日志的重新加载（与 load_ms 一样不含首次访问）
+    pending = [task["id"] for task in tasks if task["id"] % 2 == 1]
+    to_complete = iter(random.Random(7).sample(pending, min(SAMPLE, len(pending))))
+    result["mark_completed_ms"] = per_call_ms(
+        lambda: scheduler.mark_completed(next(to_complete)), min(SAMPLE, len(pending))
+    )
+    result["compact_ms"] = elapsed_ms(scheduler.store.compact)
+    for task_id in pending[:100]:
+        scheduler.mark_completed(task_id)
+    scheduler.store.sync()
+    result["reload_ms"] = elapsed_ms(lambda: new_scheduler(work_dir, name))
+
+    # 共享队列：入队 + 领取/完成（随机 DAG 下的就绪任务选择）
+    if with_queue:
+        queue = TaskQueue(os.path.join(work_dir, f"{name}.db"))
+        result["queue_enqueue_ms"] = elapsed_ms(lambda: queue.enqueue(tasks))
+
+        def claim_and_complete():
+            lease = queue.claim("bench")
+            if lease is not None:
+                queue.complete(lease)
+
+        result["queue_claim_ms"] = per_call_ms(claim_and_complete, sample)
+
+    return result
+
+
+METRICS = [
+    ("load_ms", "加载(ms)"),
+    ("first_access_ms", "首次访问(ms)"),
+    ("get_task_ms", "按id查找(ms)"),
+    ("next_task_ms", "取任务(ms)"),
+    ("get_progress_ms", "进度(ms)"),
+    ("legacy_progress_ms", "旧进度(ms)"),
+    ("mark_completed_ms", "完成写入(ms)"),
+    ("compact_ms", "压缩(ms)"),
+    ("reload_ms", "重载(ms)"),
+    ("queue_enqueue_ms", "入队(ms)"),
+    ("queue_claim_ms", "领取(ms)"),
+]
+
+
+def print_results(results: List[Dict[str, Any]]):
+    columns = [(key, title) for key, title in METRICS if any(key in r for r in results)]
+    print(f"{'tasks':>9} " + " ".join(f"{title:>12}" for _, title in columns))
+    for r in results:
+        cells = [f"{r[key]:>12.4f}" if key in r else f"{'-':>12}" for key, _ in columns]
+        print(f"{r['tasks']:>9} " + " ".join(cells))
+
+
+def compare_baseline(results: List[Dict[str, Any]], baseline_file: str, tolerance: float) -> List[str]:
+    """与基线比较，返回超出容差的指标"""
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        baseline = {r["tasks"]: r for r in json.load(f)}
+
+    regressions = []
+    for r in results:
+        base = baseline.get(r["tasks"])
+        if not base:
+            continue
+        for key, _ in METRICS:
+            if key in r and key in base and base[key] > 0 and r[key] > base[key] * tolerance:
+                regressions.append(
+                    f"{r['tasks']} tasks {key}: {r[key]:.4f}ms > {base[key]:.4f}ms x {tolerance}"
+                )
+    return regressions
+
+
+def main() -> Optional[int]:
+    parser = argparse.ArgumentParser(description="TaskScheduler 规模基准")
+    parser.add_argument("--sizes", default="1000,10000,100000",
+                        help="任务数量，逗号分隔（最大可到 1000000）")
+    parser.add_argument("--no-queue", action="store_true", help="跳过共享队列指标")
+    parser.add_argument("--legacy", action="store_true",
+                        help="同时测量原 O(n²) 进度统计（仅 ≤20000 任务）")
+    parser.add_argument("--save", help="把结果保存为基线 JSON")
+    parser.add_argument("--baseline", help="与基线 JSON 比较，超出容差返回非零")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="允许相对基线变慢的倍数")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_task_scheduler_")
+    results = []
+    try:
+        for size in (int(s) for s in args.sizes.split(",")):
+            results.append(bench_size(size, work_dir, not args.no_queue, args.legacy))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_results(results)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        regressions = compare_baseline(results, args.baseline, args.tolerance)
+        if regressions:
+            print("\n性能退化：")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\n未发现性能退化")
+    return None
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+流式执行命令
+逐行读取命令输出（stdout 与 stderr 合并）并立即回调，只在内存中保留最后若干行；
+超时后终止整个进程组，避免 shell 启动的子进程残留
+"""
+
+import os
+import time
+import signal
+import threading
+import subprocess
+from collections import deque
+from typing import Callable, Optional, List
+
+DEFAULT_TAIL_LINES = 200
+KILL_GRACE_SECONDS = 5
+
+
+class CommandResult:
+    """命令执行结果"""
+
+    def __init__(self, returncode: Optional[int], tail: List[str], timed_out: bool,
+                 duration: float, line_count: int):
+        self.returncode = returncode
+        self.tail = tail              # 最后若干行输出
+        self.timed_out = timed_out
+        self.duration = duration
+        self.line_count = line_count  # 输出总行数（含已丢弃的）
+
+    @property
+    def ok(self) -> bool:
+        return not self.timed_out and self.returncode == 0
+
+    @property
+    def tail_text(self) -> str:
+        return "\n".join(self.tail)
+
+
+def _terminate(process: subprocess.Popen):
+    """先 SIGTERM 整个进程组，宽限期后仍未退出则 SIGKILL"""
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+    except (ProcessLookupError, PermissionError):
+        return
+    try:
+        process.wait(timeout=KILL_GRACE_SECONDS)
+    except subprocess.TimeoutExpired:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        process.wait()
+
+
+def run_streaming(command: str, timeout: Optional[float] = None,
+                  on_line: Optional[Callable[[str], None]] = None,
+                  tail_lines: int = DEFAULT_TAIL_LINES, cwd: Optional[str] = None) -> CommandResult:
+    """
+    以 shell 执行命令，每读到一行就调用 on_line
+
+    内存占用只与 tail_lines 有关，与命令输出总量无关
+    """
+    started = time.monotonic()
+    process = subprocess.Popen(
+        command,
+        shell=True,
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        stdin=subprocess.DEVNULL,
+        text=True,
+        errors="replace",
+        bufsize=1,
+        start_new_session=True
+    )
+
+    tail: "deque[str]" = deque(maxlen=tail_lines)
+    counter = {"lines": 0}
+
+    def reader():
+        for line in process.stdout:
+            line = line.rstrip("\n")
+            tail.append(line)
+            counter["lines"] += 1
+            if on_line is not None:
+                on_line(line)
+        process.stdout.close()
+
+    thread = threading.Thread(target=reader, name="command-output", daemon=True)
+    thread.start()
+
+    timed_out = False
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        _terminate(process)
+    except BaseException:
+        _terminate(process)
+        raise
+    finally:
+        thread.join(timeout=KILL_GRACE_SECONDS)
+
+    return CommandResult(
+        process.returncode, list(tail), timed_out,
+        time.monotonic() - started, counter["lines"]
+    )
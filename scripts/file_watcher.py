@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+文件变化监听
+Linux 上通过 inotify（ctypes 调用 libc，无需额外依赖）监听文件所在目录，
+编辑器"写临时文件再 rename"的保存方式也能捕获；其他平台退化为定期 stat 轮询
+"""
+
+import os
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+from typing import Iterable, Optional, Tuple, Dict
+
+# inotify 事件
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+DEFAULT_POLL_INTERVAL = 1.0
+SETTLE_SECONDS = 0.05  # 收到事件后稍等，合并同一次保存产生的多个事件
+
+
+def _load_libc():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class FileWatcher:
+    """
+    监听若干文件
+
+    wait(timeout) 阻塞到任一文件变化（返回 True）或超时（返回 False）；
+    inotify 不可用时按 poll_interval 轮询 mtime/size
+    """
+
+    def __init__(self, paths: Iterable[str], poll_interval: float = DEFAULT_POLL_INTERVAL):
+        self.paths = [os.path.abspath(str(path)) for path in paths]
+        self.poll_interval = poll_interval
+        self._fd: Optional[int] = None
+        self._names: Dict[int, set] = {}
+        self._stamps = {path: self._stamp(path) for path in self.paths}
+        self._init_inotify()
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self._fd is not None
+
+    def _init_inotify(self):
+        libc = _load_libc()
+        if libc is None:
+            return
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return
+
+        directories: Dict[str, set] = {}
+        for path in self.paths:
+            directories.setdefault(os.path.dirname(path), set()).add(os.path.basename(path))
+
+        for directory, names in directories.items():
+            wd = libc.inotify_add_watch(fd, directory.encode(), WATCH_MASK)
+            if wd < 0:
+                os.close(fd)
+                return
+            self._names[wd] = names
+        self._fd = fd
+
+    @staticmethod
+    def _stamp(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _read_events(self) -> bool:
+        """读出所有待处理事件，返回是否涉及被监听的文件"""
+        matched = False
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return matched
+                raise
+            offset = 0
+            while offset < len(data):
+                wd, _mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+                offset += length
+                if name in self._names.get(wd, ()):
+                    matched = True
+
+    def _poll_changed(self) -> bool:
+        changed = False
+        for path in self.paths:
+            stamp = self._stamp(path)
+            if stamp != self._stamps[path]:
+                self._stamps[path] = stamp
+                changed = True
+        return changed
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待文件变化；timeout 为 None 时一直等待"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+
+            if self._fd is not None:
+                ready, _, _ = select.select([self._fd], [], [], remaining)
+                if ready and self._read_events():
+                    time.sleep(SETTLE_SECONDS)
+                    self._read_events()
+                    return True
+            else:
+                if self._poll_changed():
+                    return True
+                step = self.poll_interval if remaining is None else min(self.poll_interval, remaining)
+                time.sleep(step)
+                if self._poll_changed():
+                    return True
+
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+进度文件的内存模型
+读操作直接访问内存；修改以函数形式记录并标记脏数据，按间隔（或显式 flush）
+在文件锁内写回：先重新读取其他进程写入的内容，再重放本进程尚未写出的修改，
+最后原子替换文件，多个执行器共享同一个进度文件时不会互相覆盖
+"""
+
+import os
+import json
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows 没有 fcntl，退化为不加锁
+    fcntl = None
+
+from task_state_store import atomic_write_json
+
+DEFAULT_FLUSH_INTERVAL = 5.0
+
+Mutation = Callable[[Dict[str, Any]], Any]
+
+_open_stores: List["ProgressStore"] = []
+
+
+class ProgressStore:
+    """
+    写回缓存（write-behind）的进度存储
+
+    - state：当前进度（磁盘内容 + 本进程未写出的修改），只读使用
+    - update(fn)：fn 原地修改进度字典，先作用于内存，flush 时在最新磁盘内容上重放
+    - refresh()：文件被其他进程修改（mtime/size 变化）时重新加载，否则只花一次 stat
+    """
+
+    def __init__(self, path: str, default_factory: Callable[[], Dict[str, Any]],
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL):
+        self.path = str(path)
+        self.lock_path = f"{self.path}.lock"
+        self.default_factory = default_factory
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._pending: List[Mutation] = []
+        self._disk_state: Dict[str, Any] = {}
+        self._state: Dict[str, Any] = {}
+        self._disk_stamp: Optional[Tuple[int, int]] = None
+        self._last_flush = time.monotonic()
+        self._load()
+        _open_stores.append(self)
+
+    @property
+    def state(self) -> Dict[str, Any]:
+        return self._state
+
+    def snapshot(self) -> Dict[str, Any]:
+        """当前进度的深拷贝，可在其他线程中安全读取"""
+        with self._lock:
+            return json.loads(json.dumps(self._state))
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._pending)
+
+    def _stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _read_disk(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return self.default_factory()
+        except json.JSONDecodeError:
+            # 旧版本非原子写入可能留下半个文件，按默认值处理
+            return self.default_factory()
+
+    def _rebuild(self):
+        """内存状态 = 磁盘状态的副本 + 重放未写出的修改"""
+        state = json.loads(json.dumps(self._disk_state))
+        for mutation in self._pending:
+            mutation(state)
+        self._state = state
+
+    def _load(self):
+        self._disk_stamp = self._stamp()
+        self._disk_state = self._read_disk()
+        self._rebuild()
+
+    def refresh(self) -> bool:
+        """其他进程更新过文件时重新加载，返回是否重新加载"""
+        with self._lock:
+            if self._stamp() == self._disk_stamp:
+                return False
+            self._load()
+            return True
+
+    def update(self, mutation: Mutation, flush: bool = False) -> Any:
+        """记录一次修改，返回 mutation 在内存状态上的返回值"""
+        with self._lock:
+            result = mutation(self._state)
+            self._pending.append(mutation)
+            if flush or time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush()
+            return result
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.lock_path)), exist_ok=True)
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def flush(self):
+        """在文件锁内：读取最新磁盘内容、重放未写出的修改、原子写回"""
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._pending:
+                return
+            with self._file_lock():
+                disk_state = self._read_disk()
+                for mutation in self._pending:
+                    mutation(disk_state)
+                atomic_write_json(self.path, disk_state)
+                self._disk_state = disk_state
+                self._disk_stamp = self._stamp()
+            self._pending = []
+            self._rebuild()
+
+    def close(self):
+        self.flush()
+        if self in _open_stores:
+            _open_stores.remove(self)
+
+
+def flush_all():
+    """进程退出时写出所有未保存的修改"""
+    for store in list(_open_stores):
+        try:
+            store.flush()
+        except Exception:
+            pass
+
+
+atexit.register(flush_all)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+任务重试策略
+调度器和持续任务执行器共用：错误分类、指数退避 + 抖动、最大尝试次数与死信（dead letter）
+"""
+
+import random
+import subprocess
+from typing import Dict, Any, Optional
+
+# 错误分类
+TRANSIENT = "transient"    # 可能自行恢复：超时、网络、一般性非零退出
+PERMANENT = "permanent"    # 重试无意义：命令不存在、无权限
+BLOCKED = "blocked"        # 等待用户输入，不计入死信，按 blocked_delay 间隔等待
+VERIFICATION = "verification"  # 命令成功但产出未通过验证，重试直到达到上限
+
+# 抖动方式
+JITTER_FULL = "full"       # [0, backoff] 均匀分布
+JITTER_EQUAL = "equal"     # [backoff/2, backoff] 均匀分布
+JITTER_NONE = "none"
+
+PERMANENT_RETURNCODES = (126, 127)  # 命令不可执行 / 命令不存在
+
+DEFAULT_BLOCKED_DELAY = 30.0   # 等待用户输入时的检查间隔，与原执行器一致
+
+
+def classify_error(error: Optional[BaseException] = None, returncode: Optional[int] = None,
+                   timed_out: bool = False, requires_user_input: bool = False) -> str:
+    """根据异常或退出码给失败分类"""
+    if requires_user_input:
+        return BLOCKED
+    if timed_out or isinstance(error, subprocess.TimeoutExpired):
+        return TRANSIENT
+    if isinstance(error, subprocess.CalledProcessError):
+        returncode = error.returncode
+    if returncode is not None:
+        return PERMANENT if returncode in PERMANENT_RETURNCODES else TRANSIENT
+    if isinstance(error, (FileNotFoundError, PermissionError, NotADirectoryError)):
+        return PERMANENT
+    return TRANSIENT
+
+
+class RetryDecision:
+    """一次失败后的处理决定"""
+
+    def __init__(self, retry: bool, delay: float, dead_letter: bool, error_class: str):
+        self.retry = retry
+        self.delay = delay
+        self.dead_letter = dead_letter
+        self.error_class = error_class
+
+    def __repr__(self) -> str:
+        return (f"RetryDecision(retry={self.retry}, delay={self.delay:.1f}, "
+                f"dead_letter={self.dead_letter}, error_class={self.error_class!r})")
+
+
+class RetryPolicy:
+    """
+    重试策略
+
+    第 n 次失败后的退避上限为 min(max_delay, base_delay * multiplier^(n-1))，
+    再按 jitter 取随机值，避免多个 worker 同时重试
+    """
+
+    def __init__(self, max_attempts: int = 5, base_delay: float = 30.0,
+                 max_delay: float = 1800.0, multiplier: float = 2.0,
+                 jitter: str = JITTER_FULL, retry_on=(TRANSIENT, VERIFICATION),
+                 blocked_delay: float = DEFAULT_BLOCKED_DELAY, rng: Optional[random.Random] = None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.retry_on = tuple(retry_on)
+        self.blocked_delay = blocked_delay
+        self._rng = rng or random.Random()
+
+    @classmethod
+    def from_dict(cls, config: Dict[str, Any]) -> "RetryPolicy":
+        """从配置字典创建（未知键忽略）"""
+        keys = ("max_attempts", "base_delay", "max_delay", "multiplier",
+                "jitter", "retry_on", "blocked_delay")
+        return cls(**{key: config[key] for key in keys if key in config})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "max_attempts": self.max_attempts,
+            "base_delay": self.base_delay,
+            "max_delay": self.max_delay,
+            "multiplier": self.multiplier,
+            "jitter": self.jitter,
+            "retry_on": list(self.retry_on),
+            "blocked_delay": self.blocked_delay
+        }
+
+    def for_task(self, task: Dict[str, Any]) -> "RetryPolicy":
+        """任务可以用 "retry" 字段覆盖部分参数"""
+        overrides = task.get("retry")
+        if not overrides:
+            return self
+        config = self.to_dict()
+        config.update(overrides)
+        policy = RetryPolicy.from_dict(config)
+        policy._rng = self._rng
+        return policy
+
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次失败后的等待秒数"""
+        ceiling = min(self.max_delay, self.base_delay * self.multiplier ** max(attempt - 1, 0))
+        if self.jitter == JITTER_FULL:
+            return self._rng.uniform(0, ceiling)
+        if self.jitter == JITTER_EQUAL:
+            return ceiling / 2 + self._rng.uniform(0, ceiling / 2)
+        return ceiling
+
+    def decide(self, attempt: int, error_class: str) -> RetryDecision:
+        """attempt 为已经尝试的次数（含本次）"""
+        if error_class == BLOCKED:
+            return RetryDecision(True, self.blocked_delay, False, error_class)
+        if error_class not in self.retry_on:
+            return RetryDecision(False, 0.0, True, error_class)
+        if attempt >= self.max_attempts:
+            return RetryDecision(False, 0.0, True, error_class)
+        return RetryDecision(True, self.backoff(attempt), False, error_class)
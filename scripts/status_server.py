@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+运行状态 HTTP 接口
+在后台线程中运行标准库 HTTP 服务，GET /status 返回执行器内存中的进度快照（JSON），
+GET /health 用于存活检查；不读文件，也不向控制台输出
+"""
+
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Callable, Dict, Any, Optional
+
+DEFAULT_HOST = "127.0.0.1"
+
+
+class StatusServer:
+    """snapshot 在每次请求时调用，返回可 JSON 序列化的状态字典"""
+
+    def __init__(self, snapshot: Callable[[], Dict[str, Any]], port: int,
+                 host: str = DEFAULT_HOST):
+        self.snapshot = snapshot
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _handler(self):
+        snapshot = self.snapshot
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?", 1)[0].rstrip("/") or "/"
+                if path in ("/", "/status"):
+                    try:
+                        self._send(200, snapshot())
+                    except Exception as e:
+                        self._send(500, {"error": str(e)})
+                elif path == "/health":
+                    self._send(200, {"status": "ok"})
+                else:
+                    self._send(404, {"error": "not found"})
+
+            def _send(self, code: int, payload: Dict[str, Any]):
+                body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # 不输出访问日志，避免刷屏
+                pass
+
+        return Handler
+
+    @property
+    def address(self) -> str:
+        host, port = self._server.server_address[:2] if self._server else (self.host, self.port)
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StatusServer":
+        self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name="status-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+任务目录
+任务定义保存在数据文件中（JSON / JSON Lines / YAML），按需加载并建立 id 索引；
+多个目录可以组合，后面的目录可以覆盖前面同 id 的任务
+"""
+
+import os
+import json
+from typing import Dict, List, Any, Iterator, Iterable, Optional
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# 内置目录所在位置，相对路径都相对于此目录解析
+CATALOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalogs")
+
+
+def resolve_catalog_path(path: str) -> str:
+    """相对路径按 CATALOG_DIR 解析"""
+    if os.path.isabs(path):
+        return path
+    return os.path.join(CATALOG_DIR, path)
+
+
+def iter_catalog_file(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    逐个读出目录文件中的任务
+
+    - .jsonl：每行一个任务，流式解析，适合大目录
+    - .json：{"tasks": [...]} 或直接是任务数组
+    - .yaml / .yml：结构同 .json，需要安装 PyYAML
+    """
+    full_path = resolve_catalog_path(path)
+    ext = os.path.splitext(full_path)[1].lower()
+
+    if ext == ".jsonl":
+        with open(full_path, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"{full_path}:{line_no}: 任务格式错误: {e}") from e
+        return
+
+    with open(full_path, 'r', encoding='utf-8') as f:
+        if ext in (".yaml", ".yml"):
+            if yaml is None:
+                raise ImportError("读取 YAML 任务目录需要 PyYAML，请运行：pip install pyyaml")
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+
+    tasks = data.get("tasks", []) if isinstance(data, dict) else data
+    yield from tasks
+
+
+class TaskCatalog:
+    """
+    组合任务目录
+
+    首次访问 tasks / get() / len() 时才读取文件；之后按 id 查找为 O(1)
+    """
+
+    def __init__(self, paths: Iterable[str] = (), tasks: Optional[List[Dict[str, Any]]] = None):
+        self.paths = list(paths)
+        self._tasks = tasks
+        self._index: Optional[Dict[Any, int]] = None
+        if tasks is not None:
+            self._build_index()
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "TaskCatalog":
+        """从调度器状态创建：旧快照内嵌 tasks 列表，新快照只记录目录路径"""
+        if "tasks" in state:
+            return cls(tasks=state["tasks"])
+        return cls(state.get("catalogs", []))
+
+    @property
+    def tasks(self) -> List[Dict[str, Any]]:
+        """按顺序排列的全部任务（首次访问时加载）"""
+        if self._tasks is None:
+            self._load()
+        return self._tasks
+
+    def get(self, task_id: Any) -> Optional[Dict[str, Any]]:
+        """按 id 查找任务"""
+        if self._index is None:
+            self._load()
+        position = self._index.get(task_id)
+        return self._tasks[position] if position is not None else None
+
+    def iter_tasks(self) -> Iterator[Dict[str, Any]]:
+        """流式遍历所有目录中的任务，不建立索引（大目录一次性导入队列时使用）"""
+        if self._tasks is not None:
+            yield from self._tasks
+            return
+        for path in self.paths:
+            yield from iter_catalog_file(path)
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.tasks)
+
+    def _load(self):
+        self._tasks = []
+        self._index = {}
+        for path in self.paths:
+            for task in iter_catalog_file(path):
+                position = self._index.get(task["id"])
+                if position is None:
+                    self._index[task["id"]] = len(self._tasks)
+                    self._tasks.append(task)
+                else:
+                    # 后加载的目录覆盖同 id 任务，位置保持不变
+                    self._tasks[position] = task
+
+    def _build_index(self):
+        self._index = {task["id"]: i for i, task in enumerate(self._tasks)}
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+任务指纹
+对任务声明的输入（files）、输出（output）和命令计算内容哈希，
+类似 make 的增量构建：指纹不变的任务无需重复执行
+"""
+
+import os
+import json
+import hashlib
+from typing import Dict, Any, Optional, Tuple
+
+CHUNK_SIZE = 1024 * 1024
+
+# (路径, mtime_ns, size) -> sha256，同一进程内文件未变化时不重复读取
+_digest_cache: Dict[Tuple[str, int, int], str] = {}
+
+
+def file_digest(path: str) -> Optional[str]:
+    """计算文件内容的 sha256，文件不存在返回 None"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    cached = _digest_cache.get(key)
+    if cached is not None:
+        return cached
+
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            sha.update(chunk)
+
+    digest = sha.hexdigest()
+    _digest_cache[key] = digest
+    return digest
+
+
+def task_fingerprint(task: Dict[str, Any], workspace_dir: str) -> str:
+    """任务指纹：命令 + 每个输入/输出文件的内容哈希"""
+    def digests(paths):
+        return {path: file_digest(os.path.join(workspace_dir, path)) for path in paths}
+
+    payload = {
+        "commands": task.get("commands") or [],
+        "files": digests(task.get("files") or []),
+        "output": digests(task.get("output") or [])
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def is_up_to_date(task: Dict[str, Any], recorded: Optional[str], workspace_dir: str) -> bool:
+    """
+    任务是否已是最新
+
+    没有声明 output 的任务视为伪目标（phony），总是需要执行；
+    任一输出缺失也需要重新执行
+    """
+    outputs = task.get("output") or []
+    if not outputs or recorded is None:
+        return False
+
+    for path in outputs:
+        if not os.path.exists(os.path.join(workspace_dir, path)):
+            return False
+
+    return task_fingerprint(task, workspace_dir) == recorded
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+任务调度器 / 任务执行器共用的异步日志组件
+调用方只把日志放进内存队列，由后台线程批量写入 JSON Lines 文件，
+并按大小或时间轮转
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import logging.handlers
+import threading
+from datetime import datetime
+from typing import Dict, Any
+
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024   # 单个日志文件 10MB
+DEFAULT_ROTATE_INTERVAL = 24 * 3600    # 至少每天轮转一次
+DEFAULT_BACKUP_COUNT = 7
+
+_loggers: Dict[str, "TaskLogger"] = {}
+_loggers_lock = threading.Lock()
+
+
+class JSONLinesFormatter(logging.Formatter):
+    """每条日志一行 JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """控制台格式，与原调度器输出保持一致：[时间] [级别] 消息"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        timestamp = datetime.fromtimestamp(record.created).strftime("%Y-%m-%d %H:%M:%S")
+        return f"[{timestamp}] [{record.levelname}] {record.getMessage()}"
+
+
+class SizeAndTimeRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """文件超过 max_bytes 或距上次轮转超过 rotate_interval 秒时轮转"""
+
+    def __init__(self, filename: str, max_bytes: int = DEFAULT_MAX_BYTES,
+                 rotate_interval: float = DEFAULT_ROTATE_INTERVAL,
+                 backup_count: int = DEFAULT_BACKUP_COUNT):
+        dir_path = os.path.dirname(os.path.abspath(filename))
+        os.makedirs(dir_path, exist_ok=True)
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count,
+                         encoding='utf-8', delay=True)
+        self.rotate_interval = rotate_interval
+        self.rollover_at = time.time() + rotate_interval
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.rotate_interval and time.time() >= self.rollover_at:
+            # 空文件不轮转
+            if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+                return True
+            self.rollover_at = time.time() + self.rotate_interval
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = time.time() + self.rotate_interval
+
+
+class TaskLogger:
+    """
+    异步日志器
+
+    log() 只做一次入队操作；QueueListener 在后台线程里格式化并写文件，
+    进程退出时 atexit 会把队列中剩余的日志写完。
+    """
+
+    def __init__(self, name: str, log_file: str, console: bool = False,
+                 max_bytes: int = DEFAULT_MAX_BYTES,
+                 rotate_interval: float = DEFAULT_ROTATE_INTERVAL,
+                 backup_count: int = DEFAULT_BACKUP_COUNT):
+        self.name = name
+        self.log_file = log_file
+        self.console = console
+
+        file_handler = SizeAndTimeRotatingFileHandler(
+            log_file, max_bytes=max_bytes,
+            rotate_interval=rotate_interval, backup_count=backup_count
+        )
+        file_handler.setFormatter(JSONLinesFormatter())
+        handlers = [file_handler]
+
+        if console:
+            console_handler = logging.StreamHandler(sys.stdout)
+            console_handler.setFormatter(ConsoleFormatter())
+            handlers.append(console_handler)
+
+        self._queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        self._listener = logging.handlers.QueueListener(
+            self._queue, *handlers, respect_handler_level=False
+        )
+        self._handlers = handlers
+
+        self._logger = logging.Logger(name)
+        self._logger.addHandler(logging.handlers.QueueHandler(self._queue))
+        self._logger.propagate = False
+
+        self._listener.start()
+        self._closed = False
+
+    def log(self, message: str, level: str = "INFO", **fields: Any):
+        """记录一条日志，附加字段会作为 JSON 键写入"""
+        self._logger.log(
+            logging.getLevelName(level.upper()),
+            message,
+            extra={"fields": fields}
+        )
+
+    def info(self, message: str, **fields: Any):
+        self.log(message, "INFO", **fields)
+
+    def warning(self, message: str, **fields: Any):
+        self.log(message, "WARNING", **fields)
+
+    def error(self, message: str, **fields: Any):
+        self.log(message, "ERROR", **fields)
+
+    def close(self):
+        """写完队列中剩余日志并关闭文件"""
+        if self._closed:
+            return
+        self._closed = True
+        self._listener.stop()
+        for handler in self._handlers:
+            handler.close()
+
+
+def get_logger(name: str, log_file: str, console: bool = False,
+               **options: Any) -> TaskLogger:
+    """
+    按日志文件获取共享的日志器，同一文件只会有一个后台写线程
+
+    同一文件已有日志器且 console 设置不同时抛出 ValueError
+    """
+    key = os.path.abspath(log_file)
+    with _loggers_lock:
+        logger = _loggers.get(key)
+        if logger is None or logger._closed:
+            logger = TaskLogger(name, log_file, console=console, **options)
+            _loggers[key] = logger
+        elif logger.console != console:
+            raise ValueError(
+                f"日志文件 {log_file} 已由 console={logger.console} 的日志器使用，"
+                f"不能再以 console={console} 获取"
+            )
+        return logger
+
+
+@atexit.register
+def close_all():
+    """关闭所有日志器"""
+    with _loggers_lock:
+        loggers = list(_loggers.values())
+        _loggers.clear()
+    for logger in loggers:
+        logger.close()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+基于租约（lease）的任务队列
+多个调度器进程（同一台机器或共享存储卷的多台机器）从同一个 SQLite 文件领取任务：
+领取时获得租约，执行期间定期心跳续租，租约过期的任务会被其他 worker 重新领取
+"""
+
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Iterable
+
+DEFAULT_LEASE_SECONDS = 120
+DEFAULT_MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    blocked INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    available_at REAL NOT NULL DEFAULT 0,
+    fingerprint TEXT,
+    updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS deps (
+    task_id TEXT NOT NULL,
+    dep_id TEXT NOT NULL,
+    PRIMARY KEY (task_id, dep_id)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_claim ON tasks (state, blocked, seq);
+CREATE INDEX IF NOT EXISTS idx_tasks_lease ON tasks (state, lease_expires);
+CREATE INDEX IF NOT EXISTS idx_deps_dep ON deps (dep_id);
+"""
+
+
+def default_worker_id() -> str:
+    """默认 worker 标识：主机名-进程号"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def parse_prerequisites(task: Dict[str, Any]) -> List[str]:
+    """从 prerequisites 中提取任务依赖（"任务3" -> "3"），其他前置条件（如 Node.js）忽略"""
+    deps = []
+    for item in task.get("prerequisites", []):
+        if isinstance(item, str) and item.startswith("任务") and item[2:].isdigit():
+            deps.append(item[2:])
+    return deps
+
+
+class Lease:
+    """一次任务领取"""
+
+    def __init__(self, task: Dict[str, Any], worker_id: str, attempts: int, expires: float,
+                 queued_at: float):
+        self.task = task
+        self.task_id = str(task["id"])
+        self.worker_id = worker_id
+        self.attempts = attempts
+        self.expires = expires
+        self.queued_at = queued_at   # 任务最近一次变为可执行的时间
+
+
+class TaskQueue:
+    """
+    SQLite 租约队列
+
+    - 每个线程使用独立连接，写操作都在 BEGIN IMMEDIATE 事务中完成
+    - blocked 记录尚未完成的前置任务数，完成任务时增量递减，领取只需走索引
+    - 网络文件系统（NFS 等）上 WAL 模式不安全，此时传 wal=False
+    """
+
+    def __init__(self, db_path: str, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS, wal: bool = True):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.wal = wal
+        self._local = threading.local()
+
+        dir_path = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(dir_path, exist_ok=True)
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(tasks)")}
+        if "available_at" not in columns:
+            # 旧队列文件没有重试退避字段
+            conn.execute("ALTER TABLE tasks ADD COLUMN available_at REAL NOT NULL DEFAULT 0")
+        if "fingerprint" not in columns:
+            # 旧队列文件不记录完成时的输入输出指纹
+            conn.execute("ALTER TABLE tasks ADD COLUMN fingerprint TEXT")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute(f"PRAGMA journal_mode={'WAL' if self.wal else 'DELETE'}")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+
+    def enqueue(self, tasks: Iterable[Dict[str, Any]]) -> int:
+        """批量加入任务（已存在的 id 忽略），返回新增数量"""
+        now = time.time()
+        with self._transaction() as conn:
+            start_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM tasks").fetchone()[0]
+            added = 0
+            for offset, task in enumerate(tasks, 1):
+                task_id = str(task["id"])
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO tasks (id, seq, payload, updated_at) VALUES (?, ?, ?, ?)",
+                    (task_id, start_seq + offset, json.dumps(task, ensure_ascii=False), now)
+                )
+                if cursor.rowcount:
+                    added += 1
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO deps (task_id, dep_id) VALUES (?, ?)",
+                        [(task_id, dep_id) for dep_id in parse_prerequisites(task)]
+                    )
+
+            # 依赖可能指向同批次中后插入的任务，统一重算一次
+            conn.execute("""
+                UPDATE tasks SET blocked = (
+                    SELECT COUNT(*) FROM deps d JOIN tasks p ON p.id = d.dep_id
+                    WHERE d.task_id = tasks.id AND p.state != 'done'
+                ) WHERE state IN ('pending', 'leased')
+            """)
+        return added
+
+    def claim(self, worker_id: str) -> Optional[Lease]:
+        """领取一个可执行任务：待执行，或租约已过期（原 worker 崩溃）"""
+        now = time.time()
+        with self._transaction() as conn:
+            # 先回收过期租约，再按顺序取就绪任务；分开查询才能各自走索引
+            row = conn.execute("""
+                SELECT id, payload, attempts, updated_at FROM tasks
+                WHERE state = 'leased' AND lease_expires < ?
+                LIMIT 1
+            """, (now,)).fetchone()
+            if row is None:
+                row = conn.execute("""
+                    SELECT id, payload, attempts, updated_at FROM tasks
+                    WHERE state = 'pending' AND blocked = 0 AND available_at <= ?
+                    ORDER BY seq LIMIT 1
+                """, (now,)).fetchone()
+            if row is None:
+                return None
+
+            task_id, payload, attempts, queued_at = row
+            expires = now + self.lease_seconds
+            conn.execute("""
+                UPDATE tasks SET state = 'leased', owner = ?, lease_expires = ?,
+                       attempts = attempts + 1, updated_at = ?
+                WHERE id = ?
+            """, (worker_id, expires, now, task_id))
+
+        return Lease(json.loads(payload), worker_id, attempts + 1, expires, queued_at or now)
+
+    def heartbeat(self, lease: Lease) -> bool:
+        """续租；返回 False 表示租约已丢失（已过期并被其他 worker 领取）"""
+        now = time.time()
+        expires = now + self.lease_seconds
+        with self._transaction() as conn:
+            cursor = conn.execute("""
+                UPDATE tasks SET lease_expires = ?, updated_at = ?
+                WHERE id = ? AND owner = ? AND state = 'leased'
+            """, (expires, now, lease.task_id, lease.worker_id))
+        if cursor.rowcount:
+            lease.expires = expires
+            return True
+        return False
+
+    def complete(self, lease: Lease, fingerprint: Optional[str] = None) -> bool:
+        """标记完成（可同时记录任务指纹）并解除后续任务的阻塞"""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute("""
+                UPDATE tasks SET state = 'done', owner = NULL, lease_expires = NULL,
+                       fingerprint = COALESCE(?, fingerprint), updated_at = ?
+                WHERE id = ? AND owner = ? AND state = 'leased'
+            """, (fingerprint, now, lease.task_id, lease.worker_id))
+            if not cursor.rowcount:
+                return False
+            conn.execute("""
+                UPDATE tasks SET blocked = blocked - 1, updated_at = ?
+                WHERE id IN (SELECT task_id FROM deps WHERE dep_id = ?) AND blocked > 0
+            """, (now, lease.task_id))
+        return True
+
+    def fail(self, lease: Lease, error: str = "", delay: float = 0.0,
+             dead_letter: Optional[bool] = None) -> bool:
+        """
+        标记失败：放回队列并在 delay 秒后才可再次领取，或移入死信（dead_letter 状态）
+
+        dead_letter 为 None 时按 max_attempts 判断
+        """
+        now = time.time()
+        if dead_letter is None:
+            dead_letter = lease.attempts >= self.max_attempts
+        with self._transaction() as conn:
+            cursor = conn.execute("""
+                UPDATE tasks SET state = ?, owner = NULL, lease_expires = NULL,
+                       last_error = ?, available_at = ?, updated_at = ?
+                WHERE id = ? AND owner = ? AND state = 'leased'
+            """, ("dead_letter" if dead_letter else "pending", error, now + delay, now + delay,
+                  lease.task_id, lease.worker_id))
+        return bool(cursor.rowcount)
+
+    def fingerprint(self, task_id: Any) -> Optional[str]:
+        """任务最近一次完成时记录的指纹"""
+        row = self._conn().execute(
+            "SELECT fingerprint FROM tasks WHERE id = ?", (str(task_id),)
+        ).fetchone()
+        return row[0] if row else None
+
+    def stats(self) -> Dict[str, int]:
+        """各状态的任务数"""
+        rows = self._conn().execute("SELECT state, COUNT(*) FROM tasks GROUP BY state").fetchall()
+        return {state: count for state, count in rows}
+
+    def is_drained(self) -> bool:
+        """没有待执行或执行中的任务（剩下的都是 done/dead_letter 或被死信任务永久阻塞）"""
+        row = self._conn().execute("""
+            SELECT COUNT(*) FROM tasks
+            WHERE state = 'leased' OR (state = 'pending' AND blocked = 0)
+        """).fetchone()
+        return row[0] == 0
+
+    @contextmanager
+    def keep_alive(self, lease: Lease, interval: Optional[float] = None):
+        """执行期间在后台线程定期心跳"""
+        interval = interval or self.lease_seconds / 3
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(interval):
+                if not self.heartbeat(lease):
+                    break
+
+        thread = threading.Thread(target=beat, name=f"lease-{lease.task_id}", daemon=True)
+        thread.start()
+        try:
+            yield lease
+        finally:
+            stop.set()
+            thread.join()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+任务调度器状态存储
+快照 + 追加式日志（journal），每次状态变更只追加一行，定期压缩为快照
+"""
+
+import os
+import json
+import time
+from datetime import datetime
+from typing import Dict, Any, Callable, Optional, Set
+
+# fsync 策略
+FSYNC_ALWAYS = "always"    # 每个事件都 fsync，最安全
+FSYNC_BATCH = "batch"      # 每 N 个事件或每隔 T 秒 fsync 一次
+FSYNC_NEVER = "never"      # 交给操作系统刷盘，最快
+FSYNC_POLICIES = (FSYNC_ALWAYS, FSYNC_BATCH, FSYNC_NEVER)
+
+
+def atomic_write_json(path: str, data: Any, indent: Optional[int] = 2):
+    """原子写入 JSON：写临时文件、fsync、rename 覆盖，崩溃时旧文件保持完整"""
+    dir_path = os.path.dirname(os.path.abspath(path))
+    os.makedirs(dir_path, exist_ok=True)
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp_path, path)
+    _fsync_dir(dir_path)
+
+
+def _fsync_dir(dir_path: str):
+    """fsync 目录，确保 rename 本身落盘（部分平台不支持，忽略）"""
+    try:
+        fd = os.open(dir_path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def apply_event(state: Dict[str, Any], event: Dict[str, Any], completed_ids: Set[Any]):
+    """把单个状态变更事件应用到内存状态，completed_ids 是 completed_tasks 的集合索引"""
+    event_type = event.get("type")
+
+    if event_type == "task_completed":
+        if event["task_id"] not in completed_ids:
+            completed_ids.add(event["task_id"])
+            state.setdefault("completed_tasks", []).append(event["task_id"])
+    elif event_type == "task_index":
+        state["current_task_index"] = event["index"]
+    elif event_type == "task_dead_lettered":
+        # 每个任务只保留最近一条；快照落盘后、日志截断前崩溃时重放同一事件不会重复
+        dead_letter = [item for item in state.get("dead_letter", [])
+                       if item.get("task_id") != event["task_id"]]
+        dead_letter.append({
+            "task_id": event["task_id"],
+            "error_class": event.get("error_class"),
+            "attempts": event.get("attempts"),
+            "ts": event.get("ts")
+        })
+        state["dead_letter"] = dead_letter
+    elif event_type == "task_fingerprint":
+        state.setdefault("fingerprints", {})[str(event["task_id"])] = event["fingerprint"]
+
+    if event.get("ts"):
+        state["last_update"] = event["ts"]
+
+
+class TaskStateStore:
+    """
+    日志式状态存储
+
+    - 快照文件：与原 task_scheduler.json 格式相同
+    - 日志文件：每行一个 JSON 事件，只追加
+    - 加载时：读快照，再按顺序重放日志；末尾被截断的半行直接丢弃
+    - 压缩：把当前状态原子写入快照，然后清空日志
+    """
+
+    def __init__(self, snapshot_file: str, journal_file: str,
+                 default_factory: Callable[[], Dict[str, Any]],
+                 fsync_policy: str = FSYNC_BATCH,
+                 fsync_every: int = 20,
+                 fsync_interval: float = 5.0,
+                 compact_every: int = 200,
+                 compact_ratio: float = 0.5):
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"未知的 fsync 策略: {fsync_policy}")
+
+        self.snapshot_file = snapshot_file
+        self.journal_file = journal_file
+        self.default_factory = default_factory
+        self.fsync_policy = fsync_policy
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        self.compact_ratio = compact_ratio
+
+        self.state: Dict[str, Any] = {}
+        self.completed_ids: Set[Any] = set()
+        self._journal = None
+        self._journal_events = 0
+        self._journal_bytes = 0
+        self._snapshot_bytes = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def load(self) -> Dict[str, Any]:
+        """加载快照并重放日志"""
+        if os.path.exists(self.snapshot_file):
+            with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                self.state = json.load(f)
+            self._snapshot_bytes = os.path.getsize(self.snapshot_file)
+        else:
+            self.state = self.default_factory()
+        self.completed_ids = set(self.state.get("completed_tasks", []))
+
+        self._journal_events = 0
+        self._journal_bytes = 0
+        if os.path.exists(self.journal_file):
+            with open(self.journal_file, 'rb') as f:
+                for line in f:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("incomplete line")
+                        event = json.loads(line)
+                    except ValueError:
+                        # 崩溃时最后一行可能只写了一半
+                        break
+                    apply_event(self.state, event, self.completed_ids)
+                    self._journal_events += 1
+                    self._journal_bytes += len(line)
+
+            # 截掉半行，之后的追加从干净的行边界开始（无需全量压缩）
+            if os.path.getsize(self.journal_file) > self._journal_bytes:
+                with open(self.journal_file, 'r+b') as f:
+                    f.truncate(self._journal_bytes)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+        return self.state
+
+    def record(self, event: Dict[str, Any]):
+        """应用事件并追加到日志，O(1) 写入"""
+        event.setdefault("ts", datetime.now().isoformat())
+        apply_event(self.state, event, self.completed_ids)
+
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        journal = self._open_journal()
+        journal.write(line)
+        journal.flush()
+
+        self._journal_events += 1
+        self._journal_bytes += len(line.encode('utf-8'))
+        self._unsynced += 1
+        self._maybe_fsync()
+
+        if self._should_compact():
+            self.compact()
+
+    def compact(self):
+        """把当前状态写成快照并清空日志"""
+        self.sync()
+        atomic_write_json(self.snapshot_file, self.state)
+        self._snapshot_bytes = os.path.getsize(self.snapshot_file)
+
+        # 快照已落盘，此后截断日志即使中途崩溃，重放也是幂等的
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        with open(self.journal_file, 'w', encoding='utf-8') as f:
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._journal_events = 0
+        self._journal_bytes = 0
+
+    def sync(self):
+        """强制把日志刷到磁盘"""
+        if self._journal is not None and self._unsynced:
+            os.fsync(self._journal.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        """退出前压缩，下次启动无需重放"""
+        self.compact()
+
+    def _should_compact(self) -> bool:
+        """
+        日志达到 compact_every 条且体积不小于快照的 compact_ratio 时压缩，
+        大快照的重写成本被更多次追加摊薄，单次写入保持摊还 O(1)
+        """
+        if not self.compact_every or self._journal_events < self.compact_every:
+            return False
+        return self._journal_bytes >= self._snapshot_bytes * self.compact_ratio
+
+    def _open_journal(self):
+        if self._journal is None:
+            dir_path = os.path.dirname(os.path.abspath(self.journal_file))
+            os.makedirs(dir_path, exist_ok=True)
+            self._journal = open(self.journal_file, 'a', encoding='utf-8')
+        return self._journal
+
+    def _maybe_fsync(self):
+        if self.fsync_policy == FSYNC_ALWAYS:
+            self.sync()
+        elif self.fsync_policy == FSYNC_BATCH:
+            if (self._unsynced >= self.fsync_every
+                    or time.monotonic() - self._last_sync >= self.fsync_interval):
+                self.sync()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+任务执行追踪
+每个任务一次执行记为一个 span（含排队等待、重试次数、结果），每条命令记为子 span，
+以 JSON Lines 导出；report 子命令对比实际耗时与 estimated_time
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import argparse
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from statistics import mean, median
+from typing import Dict, List, Any, Optional, Tuple
+
+TIME_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*(小时|分钟|秒|h|min|m|s)")
+TIME_UNITS = {"小时": 60, "h": 60, "分钟": 1, "min": 1, "m": 1, "秒": 1 / 60, "s": 1 / 60}
+
+
+class Span:
+    """一个追踪区间"""
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = attributes or {}
+        self.status = "ok"
+        self.start = time.time()
+        self._start_perf = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+
+    def finish(self):
+        self.duration_ms = round((time.perf_counter() - self._start_perf) * 1000, 3)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": datetime.fromtimestamp(self.start).isoformat(),
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "attributes": self.attributes
+        }
+
+
+class TaskTracer:
+    """把 span 以 JSON Lines 追加到追踪文件"""
+
+    def __init__(self, trace_file: Optional[str]):
+        self.trace_file = trace_file
+        self._file = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, parent: Optional[Span] = None, **attributes: Any):
+        """开启一个 span，退出时记录耗时并导出；异常时 status 记为 error"""
+        trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        span = Span(name, trace_id, parent.span_id if parent else None, attributes)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.attributes.setdefault("error", str(e))
+            raise
+        finally:
+            span.finish()
+            self.export(span)
+
+    def export(self, span: Span):
+        if not self.trace_file:
+            return
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.trace_file)), exist_ok=True)
+                self._file = open(self.trace_file, 'a', encoding='utf-8', buffering=1)
+            self._file.write(line)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def parse_estimated_minutes(text: Any) -> Optional[float]:
+    """把 "30分钟"、"1小时30分钟"、"45min" 解析为分钟数"""
+    if isinstance(text, (int, float)):
+        return float(text)
+    if not isinstance(text, str):
+        return None
+    matches = TIME_PATTERN.findall(text)
+    if not matches:
+        return None
+    return sum(float(value) * TIME_UNITS[unit] for value, unit in matches)
+
+
+def load_task_spans(trace_file: str) -> List[Dict[str, Any]]:
+    """读取所有任务级 span"""
+    spans = []
+    with open(trace_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                span = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if span.get("name") == "task":
+                spans.append(span)
+    return spans
+
+
+def build_report(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """按 (category, difficulty) 汇总实际耗时与预估耗时"""
+    groups: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    for span in spans:
+        attrs = span.get("attributes", {})
+        if attrs.get("outcome") == "skipped":
+            continue
+        key = (attrs.get("category", "-"), attrs.get("difficulty", "-"))
+        groups.setdefault(key, []).append(span)
+
+    rows = []
+    for (category, difficulty), items in sorted(groups.items()):
+        actual = [s["duration_ms"] / 60000 for s in items if s.get("duration_ms") is not None]
+        estimated = [
+            m for m in (parse_estimated_minutes(s["attributes"].get("estimated_time")) for s in items)
+            if m is not None
+        ]
+        waits = [s["attributes"].get("queue_wait_ms", 0) / 60000 for s in items]
+        successes = sum(1 for s in items if s["attributes"].get("outcome") == "success")
+        # 每次执行的 span 都带着截至当时的重试次数，按任务取最大值而不是逐条相加
+        task_retries: Dict[Any, int] = {}
+        for s in items:
+            task_key = s["attributes"].get("task_id", s.get("span_id"))
+            task_retries[task_key] = max(task_retries.get(task_key, 0), s["attributes"].get("retries", 0))
+        retries = sum(task_retries.values())
+
+        row = {
+            "category": category,
+            "difficulty": difficulty,
+            "runs": len(items),
+            "success_rate": successes / len(items) if items else 0,
+            "retries": retries,
+            "actual_mean_min": mean(actual) if actual else None,
+            "actual_median_min": median(actual) if actual else None,
+            "estimated_min": mean(estimated) if estimated else None,
+            "queue_wait_mean_min": mean(waits) if waits else None
+        }
+        if row["actual_mean_min"] is not None and row["estimated_min"]:
+            row["actual_vs_estimated"] = row["actual_mean_min"] / row["estimated_min"]
+        else:
+            row["actual_vs_estimated"] = None
+        rows.append(row)
+    return rows
+
+
+def print_report(rows: List[Dict[str, Any]]):
+    """打印实际耗时 vs 预估耗时"""
+    def fmt(value, pattern="{:.2f}"):
+        return "-" if value is None else pattern.format(value)
+
+    print(f"{'分类':<10} {'难度':<6} {'次数':>4} {'成功率':>7} {'重试':>4} "
+          f"{'实际均值(分)':>12} {'实际中位(分)':>12} {'预估(分)':>9} {'实际/预估':>9} {'排队(分)':>9}")
+    for row in rows:
+        print(f"{row['category']:<10} {row['difficulty']:<6} {row['runs']:>4} "
+              f"{fmt(row['success_rate'], '{:.0%}'):>7} {row['retries']:>4} "
+              f"{fmt(row['actual_mean_min']):>12} {fmt(row['actual_median_min']):>12} "
+              f"{fmt(row['estimated_min'], '{:.0f}'):>9} {fmt(row['actual_vs_estimated'], '{:.2f}x'):>9} "
+              f"{fmt(row['queue_wait_mean_min']):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="任务耗时报告：实际耗时 vs estimated_time")
+    parser.add_argument("trace_file", help="追踪文件（JSON Lines）")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出")
+    args = parser.parse_args()
+
+    rows = build_report(load_task_spans(args.trace_file))
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+    else:
+        print_report(rows)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+任务结果验证
+根据任务声明的产出（output，未声明时用 files）自动检查：文件存在且非空、
+.sol 文件能用 solc 编译、verify_commands 中的测试命令退出码为 0；
+检查在线程池中并发执行，文件未变化时直接复用缓存的结果
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+from task_state_store import atomic_write_json
+from task_fingerprint import file_digest
+
+DEFAULT_WORKERS = 4
+COMMAND_TIMEOUT = 300
+DETAIL_LIMIT = 2000  # 缓存中保存的命令输出上限（字符）
+
+
+class CheckResult:
+    """单项检查结果"""
+
+    def __init__(self, name: str, target: str, passed: bool, detail: str = "",
+                 skipped: bool = False, cached: bool = False):
+        self.name = name
+        self.target = target
+        self.passed = passed
+        self.detail = detail
+        self.skipped = skipped
+        self.cached = cached
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "target": self.target,
+            "passed": self.passed,
+            "detail": self.detail,
+            "skipped": self.skipped
+        }
+
+
+class VerificationReport:
+    """一个任务的全部检查结果"""
+
+    def __init__(self, task_id: Any, checks: List[CheckResult]):
+        self.task_id = task_id
+        self.checks = checks
+
+    @property
+    def passed(self) -> bool:
+        return all(check.passed for check in self.checks)
+
+    @property
+    def failures(self) -> List[CheckResult]:
+        return [check for check in self.checks if not check.passed]
+
+    @property
+    def manual(self) -> bool:
+        """没有任何可自动检查的内容，只能人工确认 verification 描述"""
+        return not self.checks
+
+
+def declared_outputs(task: Dict[str, Any]) -> List[str]:
+    """需要检查的产出文件：优先 output，未声明时用 files"""
+    return list(task.get("output") or task.get("files") or [])
+
+
+class TaskVerifier:
+    """
+    并发验证器
+
+    每项检查是一个独立的工作单元，提交到共享线程池；solc 和测试命令的结果按
+    （检查项, 相关文件内容哈希）缓存到 JSON 文件，文件未变化时不重复执行
+    """
+
+    def __init__(self, workspace_dir: str, cache_file: Optional[str] = None,
+                 max_workers: int = DEFAULT_WORKERS, solc: Optional[str] = None,
+                 command_timeout: float = COMMAND_TIMEOUT):
+        self.workspace_dir = workspace_dir
+        self.cache_file = cache_file
+        self.command_timeout = command_timeout
+        self.solc = solc or shutil.which("solc")
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="verify")
+        self._lock = threading.Lock()
+        self._cache: Dict[str, Dict[str, Any]] = self._load_cache()
+        self._dirty = False
+
+    def _load_cache(self) -> Dict[str, Dict[str, Any]]:
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return {}
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def save_cache(self):
+        """把新增的缓存结果写回文件"""
+        with self._lock:
+            if not self.cache_file or not self._dirty:
+                return
+            snapshot = dict(self._cache)
+            self._dirty = False
+        atomic_write_json(self.cache_file, snapshot, indent=None)
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+        self.save_cache()
+
+    def _path(self, relative: str) -> str:
+        return os.path.join(self.workspace_dir, relative)
+
+    def _cache_key(self, name: str, target: str, paths: List[str]) -> Optional[str]:
+        """检查项 + 相关文件内容哈希；有文件缺失时不缓存"""
+        digests = []
+        for path in paths:
+            digest = file_digest(self._path(path))
+            if digest is None:
+                return None
+            digests.append((path, digest))
+        payload = json.dumps([name, target, digests], ensure_ascii=False).encode('utf-8')
+        return hashlib.sha256(payload).hexdigest()
+
+    def _cached_run(self, name: str, target: str, paths: List[str], run) -> CheckResult:
+        key = self._cache_key(name, target, paths)
+        if key is not None:
+            with self._lock:
+                entry = self._cache.get(key)
+            if entry is not None:
+                return CheckResult(name, target, entry["passed"], entry.get("detail", ""), cached=True)
+
+        result = run()
+        if key is not None and not result.skipped:
+            with self._lock:
+                self._cache[key] = {
+                    "passed": result.passed,
+                    "detail": result.detail[-DETAIL_LIMIT:],
+                    "checked_at": datetime.now().isoformat()
+                }
+                self._dirty = True
+        return result
+
+    def check_exists(self, path: str) -> CheckResult:
+        """文件存在且非空"""
+        try:
+            size = os.path.getsize(self._path(path))
+        except OSError:
+            return CheckResult("exists", path, False, "文件不存在")
+        if size == 0:
+            return CheckResult("exists", path, False, "文件为空")
+        return CheckResult("exists", path, True)
+
+    def check_solc(self, path: str) -> CheckResult:
+        """用 solc 编译 .sol 文件（未安装 solc 时跳过）"""
+        if not self.solc:
+            return CheckResult("solc", path, True, "未安装 solc，跳过编译检查", skipped=True)
+        if not os.path.exists(self._path(path)):
+            return CheckResult("solc", path, False, "文件不存在")
+
+        def run():
+            return self._run_command("solc", path, [self.solc, "--bin", path], shell=False)
+
+        return self._cached_run("solc", path, [path], run)
+
+    def check_command(self, command: str, paths: List[str]) -> CheckResult:
+        """运行测试命令，退出码为 0 视为通过；相关文件不变时复用上次结果"""
+        return self._cached_run(
+            "command", command, paths,
+            lambda: self._run_command("command", command, command, shell=True)
+        )
+
+    def _run_command(self, name: str, target: str, args, shell: bool) -> CheckResult:
+        try:
+            result = subprocess.run(
+                args, shell=shell, cwd=self.workspace_dir,
+                capture_output=True, text=True, timeout=self.command_timeout
+            )
+        except subprocess.TimeoutExpired:
+            return CheckResult(name, target, False, f"超时（{self.command_timeout} 秒）")
+        except OSError as e:
+            return CheckResult(name, target, False, str(e))
+        output = (result.stdout + result.stderr).strip()
+        return CheckResult(name, target, result.returncode == 0, output)
+
+    def _submit_checks(self, task: Dict[str, Any]) -> List[Any]:
+        outputs = declared_outputs(task)
+        futures = []
+        for path in outputs:
+            futures.append(self._pool.submit(self.check_exists, path))
+            if path.endswith(".sol"):
+                futures.append(self._pool.submit(self.check_solc, path))
+        for command in task.get("verify_commands") or []:
+            futures.append(self._pool.submit(self.check_command, command, outputs))
+        return futures
+
+    def verify(self, task: Dict[str, Any]) -> VerificationReport:
+        """验证单个任务（各项检查并发执行）"""
+        futures = self._submit_checks(task)
+        report = VerificationReport(task["id"], [future.result() for future in futures])
+        self.save_cache()
+        return report
+
+    def verify_many(self, tasks: List[Dict[str, Any]]) -> List[VerificationReport]:
+        """批量验证：先提交所有任务的检查，再按任务顺序收集结果"""
+        pending = [(task, self._submit_checks(task)) for task in tasks]
+        reports = [
+            VerificationReport(task["id"], [future.result() for future in futures])
+            for task, futures in pending
+        ]
+        self.save_cache()
+        return reports
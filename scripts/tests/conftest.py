@@ -0,0 +1,6 @@
+"""测试公共设置：脚本之间直接按模块名互相导入，把 scripts 加入 sys.path"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,53 @@
+"""
+TaskStateStore 的重放测试
+压缩时快照已写入、日志尚未清空就崩溃，下次加载会把同一段日志重放到已包含这些事件的快照上
+"""
+
+import shutil
+
+from task_state_store import TaskStateStore
+
+
+def make_store(tmp_path):
+    return TaskStateStore(
+        str(tmp_path / "state.json"), str(tmp_path / "state.journal"),
+        default_factory=lambda: {"completed_tasks": [], "current_task_index": 0},
+        fsync_policy="never", compact_every=0
+    )
+
+
+def record_events(store):
+    store.record({"type": "task_completed", "task_id": 1})
+    store.record({"type": "task_index", "index": 2})
+    store.record({"type": "task_dead_lettered", "task_id": 2, "error_class": "fatal", "attempts": 3})
+    store.record({"type": "task_fingerprint", "task_id": 1, "fingerprint": "abc"})
+
+
+def test_replay_over_compacted_snapshot_is_idempotent(tmp_path):
+    store = make_store(tmp_path)
+    store.load()
+    record_events(store)
+    store.sync()
+
+    # 模拟 compact() 写完快照、清空日志前崩溃
+    journal = tmp_path / "state.journal"
+    shutil.copy(journal, tmp_path / "journal.bak")
+    store.compact()
+    shutil.copy(tmp_path / "journal.bak", journal)
+    expected = dict(store.state)
+
+    reloaded = make_store(tmp_path)
+    state = reloaded.load()
+
+    assert state == expected
+    assert state["completed_tasks"] == [1]
+    assert [item["task_id"] for item in state["dead_letter"]] == [2]
+
+
+def test_dead_letter_keeps_latest_entry_per_task(tmp_path):
+    store = make_store(tmp_path)
+    store.load()
+    store.record({"type": "task_dead_lettered", "task_id": 5, "error_class": "transient", "attempts": 3})
+    store.record({"type": "task_dead_lettered", "task_id": 5, "error_class": "fatal", "attempts": 1})
+
+    assert [(item["task_id"], item["error_class"]) for item in store.state["dead_letter"]] == [(5, "fatal")]
@@ -0,0 +1,34 @@
+"""task_tracing.build_report 的汇总测试"""
+
+from task_tracing import build_report
+
+
+def task_span(task_id, attempt, outcome, duration_ms=60000):
+    return {
+        "name": "task",
+        "span_id": f"{task_id}-{attempt}",
+        "duration_ms": duration_ms,
+        "attributes": {
+            "task_id": task_id,
+            "category": "学习",
+            "difficulty": "中等",
+            "estimated_time": "1 分钟",
+            "attempt": attempt,
+            "retries": attempt - 1,
+            "outcome": outcome
+        }
+    }
+
+
+def test_retries_counted_once_per_task():
+    spans = [
+        task_span(1, 1, "failed"), task_span(1, 2, "failed"), task_span(1, 3, "success"),
+        task_span(2, 1, "success"),
+        task_span(3, 1, "failed"), task_span(3, 2, "success"),
+    ]
+
+    [row] = build_report(spans)
+
+    assert row["runs"] == 6
+    assert row["retries"] == 3   # 任务 1 重试 2 次，任务 3 重试 1 次
+    assert row["success_rate"] == 0.5
@@ -13,6 +13,7 @@ sys.path.insert(0, "/root/clawd/travel-planner-agent/src")
 
 from tools.weather_api import WeatherAPI
 from tools.currency_api import CurrencyAPI
+from utils.http_client import http_clients
 
 
 class TravelPlannerCLI:
@@ -178,9 +179,8 @@ class TravelPlannerCLI:
         print()
 
         try:
-            # 并发查询所有城市的天气
-            weather_tasks = [self.weather_api.get_weather(city) for city in cities]
-            weather_results = await asyncio.gather(*weather_tasks)
+            # 批量查询所有城市的天气（group 接口，每次最多 20 个城市）
+            weather_results = await self.weather_api.get_weather_many(cities)
 
             for weather in weather_results:
                 print(f"📍 {weather.city}")
@@ -236,11 +236,6 @@ class TravelPlannerCLI:
                 print("\n👋 感谢使用 Travel Planner Agent CLI！")
                 print("祝您旅途愉快！✈️")
                 print()
-
-                # 关闭 API 连接
-                await self.weather_api.close()
-                await self.currency_api.close()
-
                 break
 
             else:
@@ -250,8 +245,10 @@ class TravelPlannerCLI:
 
 async def main():
     """主函数"""
-    cli = TravelPlannerCLI()
-    await cli.run()
+    # 退出时统一关闭共享的 HTTP 连接池
+    async with http_clients():
+        cli = TravelPlannerCLI()
+        await cli.run()
 
 
 if __name__ == "__main__":
@@ -4,12 +4,22 @@
 """
 
 import os
+import sys
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 from decimal import Decimal
 import httpx
 from pydantic import BaseModel
 
+if __name__ == "__main__":
+    # 直接运行本文件时（python src/tools/currency_api.py），与 main_cli 一样把 src 加入 sys.path
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.single_flight import SingleFlight, get_shared_flight
+from utils.http_client import get_client, http_clients
+from utils.circuit_breaker import CircuitBreaker, get_breaker
+from utils.rate_table import RateTable, get_shared_rate_table
+
 # 基础配置
 OPEN_EXCHANGE_API_KEY = os.getenv("OPEN_EXCHANGE_API_KEY", "")
 FIXER_API_KEY = os.getenv("FIXER_API_KEY", "")
@@ -40,8 +50,32 @@ class CurrencyConversion(BaseModel):
 class CurrencyAPI:
     """汇率查询 API"""
 
-    def __init__(self):
-        self.client = httpx.AsyncClient(timeout=10.0)
+    def __init__(self, flight: Optional[SingleFlight] = None,
+                 client: Optional[httpx.AsyncClient] = None,
+                 breaker: Optional[CircuitBreaker] = None,
+                 rates: Optional[RateTable] = None):
+        # 默认使用进程内共享的连接池，由 http_clients() / close_clients() 统一关闭
+        self._client = client
+        # 相同货币对并发查询时只请求一次
+        self.flight = flight if flight is not None else get_shared_flight("currency")
+        # 汇率服务故障时熔断，直接返回模拟汇率
+        self.breaker = breaker if breaker is not None else get_breaker("currency")
+        # 预先算好的交叉汇率表；模拟汇率按货币对缓存，汇率表刷新后失效
+        self.rates = rates if rates is not None else get_shared_rate_table()
+        self._mock_rates: Dict[tuple, ExchangeRate] = {}
+        self._mock_snapshot = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._client if self._client is not None else get_client("currency")
+
+    def coalescing_stats(self) -> Dict[str, int]:
+        """请求合并统计：coalesced 为复用了其他调用结果的次数"""
+        return self.flight.stats()
+
+    def breaker_state(self) -> Dict[str, Any]:
+        """熔断器状态：state 为 closed / open / half_open"""
+        return self.breaker.snapshot()
 
     async def get_exchange_rate(
         self,
@@ -60,7 +94,12 @@ class CurrencyAPI:
         """
         try:
             # 尝试调用真实 API
-            rate = await self._fetch_real_rate(from_currency, to_currency)
+            rate = await self.flight.do(
+                (from_currency, to_currency),
+                lambda: self.breaker.call(
+                    lambda: self._fetch_real_rate(from_currency, to_currency)
+                )
+            )
 
             return ExchangeRate(
                 base_currency=from_currency,
@@ -72,7 +111,7 @@ class CurrencyAPI:
             )
 
         except Exception as e:
-            # 如果 API 调用失败，返回模拟数据
+            # API 调用失败或熔断中，返回模拟数据
             return self._get_mock_rate(from_currency, to_currency)
 
     async def _fetch_real_rate(
@@ -166,82 +205,27 @@ class CurrencyAPI:
         }
 
     def _get_mock_rate(self, from_currency: str, to_currency: str) -> ExchangeRate:
-        """获取模拟汇率"""
-        # 常用货币对汇率（参考 2026 年汇率）
-        mock_rates = {
-            "CNY": {
-                "USD": Decimal("0.138"),
-                "JPY": Decimal("20.5"),
-                "EUR": Decimal("0.127"),
-                "GBP": Decimal("0.110"),
-                "KRW": Decimal("185.5"),
-                "HKD": Decimal("1.075"),
-                "SGD": Decimal("0.188"),
-                "AUD": Decimal("0.210"),
-                "CAD": Decimal("0.188")
-            },
-            "USD": {
-                "CNY": Decimal("7.246"),
-                "JPY": Decimal("148.5"),
-                "EUR": Decimal("0.921"),
-                "GBP": Decimal("0.797"),
-                "KRW": Decimal("1344.2"),
-                "HKD": Decimal("7.789"),
-                "SGD": Decimal("1.361"),
-                "AUD": Decimal("1.522"),
-                "CAD": Decimal("1.361")
-            },
-            "JPY": {
-                "CNY": Decimal("0.0488"),
-                "USD": Decimal("0.00673"),
-                "EUR": Decimal("0.00621"),
-                "GBP": Decimal("0.00537"),
-                "KRW": Decimal("9.052"),
-                "HKD": Decimal("0.0524"),
-                "SGD": Decimal("0.00917"),
-                "AUD": Decimal("0.01025"),
-                "CAD": Decimal("0.00917")
-            },
-            "EUR": {
-                "CNY": Decimal("7.874"),
-                "USD": Decimal("1.086"),
-                "JPY": Decimal("161.2"),
-                "GBP": Decimal("0.866"),
-                "KRW": Decimal("1459.3"),
-                "HKD": Decimal("8.462"),
-                "SGD": Decimal("1.478"),
-                "AUD": Decimal("1.653"),
-                "CAD": Decimal("1.478")
-            }
-        }
-
-        # 默认汇率（1:1）
-        default_rate = Decimal("1.0")
-
-        # 尝试从字典中获取汇率
-        if from_currency in mock_rates and to_currency in mock_rates[from_currency]:
-            rate = mock_rates[from_currency][to_currency]
-        elif from_currency == to_currency:
-            rate = default_rate
-        else:
-            # 如果没有找到汇率，使用近似计算（通过 USD）
-            if from_currency != "USD" and "USD" in mock_rates:
-                usd_rate = mock_rates[from_currency]["USD"]
-                if to_currency in mock_rates["USD"]:
-                    rate = usd_rate * mock_rates["USD"][to_currency]
-                else:
-                    rate = usd_rate  # 默认为 1
-            else:
-                rate = default_rate
-
-        return ExchangeRate(
-            base_currency=from_currency,
-            target_currency=to_currency,
-            rate=rate,
-            inverse_rate=Decimal(1) / rate if rate > 0 else default_rate,
-            timestamp=datetime.now(),
-            source="Mock"
-        )
+        """获取模拟汇率（查预先算好的汇率表，表中没有的货币对按 1:1）"""
+        snapshot = self.rates.snapshot
+        if snapshot is not self._mock_snapshot:
+            self._mock_rates = {}
+            self._mock_snapshot = snapshot
+
+        pair = (from_currency, to_currency)
+        exchange_rate = self._mock_rates.get(pair)
+        if exchange_rate is None:
+            # 默认汇率（1:1）
+            default_rate = Decimal("1.0")
+            exchange_rate = ExchangeRate(
+                base_currency=from_currency,
+                target_currency=to_currency,
+                rate=snapshot.rates.get(pair, default_rate),
+                inverse_rate=snapshot.inverse.get(pair, default_rate),
+                timestamp=snapshot.loaded_at,
+                source=snapshot.source
+            )
+            self._mock_rates[pair] = exchange_rate
+        return exchange_rate
 
     async def get_currency_list(self) -> List[Dict[str, str]]:
         """获取支持的货币列表"""
@@ -335,43 +319,37 @@ class CurrencyAPI:
 
         return tips
 
-    async def close(self):
-        """关闭 HTTP 客户"""
-        await self.client.aclose()
-
 
 # 使用示例
 async def example_usage():
     """使用示例"""
-    api = CurrencyAPI()
-
-    # 获取汇率
-    rate = await api.get_exchange_rate("CNY", "JPY")
-    print(f"汇率：{rate.rate}")
-
-    # 货币转换
-    conversion = await api.convert_currency(10000, "CNY", "JPY")
-    print(f"转换：{conversion.amount} CNY = {conversion.converted_amount} JPY")
-
-    # 获取历史汇率
-    historical = await api.get_historical_rates(
-        "CNY",
-        "JPY",
-        datetime.now() - datetime.timedelta(days=7),
-        datetime.now()
-    )
-    print(f"历史汇率：{len(historical['rates'])} 天")
-
-    # 获取旅行建议
-    advice = await api.get_travel_exchange_advice(
-        budget=100000,
-        from_currency="CNY",
-        to_currencies=["USD", "EUR", "JPY"]
-    )
-    print(f"旅行建议：{advice['best_conversion'].to_currency}")
-
-    # 关闭连接
-    await api.close()
+    async with http_clients():
+        api = CurrencyAPI()
+
+        # 获取汇率
+        rate = await api.get_exchange_rate("CNY", "JPY")
+        print(f"汇率：{rate.rate}")
+
+        # 货币转换
+        conversion = await api.convert_currency(10000, "CNY", "JPY")
+        print(f"转换：{conversion.amount} CNY = {conversion.converted_amount} JPY")
+
+        # 获取历史汇率
+        historical = await api.get_historical_rates(
+            "CNY",
+            "JPY",
+            datetime.now() - datetime.timedelta(days=7),
+            datetime.now()
+        )
+        print(f"历史汇率：{len(historical['rates'])} 天")
+
+        # 获取旅行建议
+        advice = await api.get_travel_exchange_advice(
+            budget=100000,
+            from_currency="CNY",
+            to_currencies=["USD", "EUR", "JPY"]
+        )
+        print(f"旅行建议：{advice['best_conversion'].to_currency}")
 
 
 if __name__ == "__main__":
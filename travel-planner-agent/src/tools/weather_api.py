@@ -4,14 +4,50 @@
 """
 
 import os
+import sys
+import asyncio
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
 import httpx
 from pydantic import BaseModel
 
+if __name__ == "__main__":
+    # 直接运行本文件时（python src/tools/weather_api.py），与 main_cli 一样把 src 加入 sys.path
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.cache import TTLCache, get_shared_cache
+from utils.single_flight import SingleFlight, get_shared_flight
+from utils.geocoding import GeoCache, get_shared_geocache
+from utils.forecast_stats import ScoringModel, best_days
+from utils.http_client import get_client, http_clients
+from utils.circuit_breaker import CircuitBreaker, get_breaker
+from utils.replay_transport import FixtureNotFound
+
 # 基础配置
-BASE_URL = "https://api.openweathermap.org/data/2.5"
+BASE_URL = os.getenv("WEATHER_API_BASE_URL", "https://api.openweathermap.org/data/2.5")
 API_KEY = os.getenv("WEATHER_API_KEY", "demo_key")
+UNITS = "metric"
+LANG = "zh_cn"
+
+# 批量查询：group 接口每次最多 20 个城市，同时进行的请求数上限
+GROUP_CHUNK_SIZE = 20
+GROUP_CONCURRENCY = 4
+
+# 常用目的地的 OpenWeatherMap 城市 ID（地理编码缓存未命中时使用；也是预热的默认城市）
+CITY_IDS = {
+    "东京": 1850147,
+    "京都": 1857910,
+    "大阪": 1853909,
+    "奈良": 1855612,
+    "上海": 1796236,
+    "北京": 1816670
+}
+
+# 缓存时间（秒）：(新鲜时间, 过期后仍可先返回旧值的宽限时间)
+CACHE_TTL = {
+    "weather": (600, 1800),       # 当前天气 10 分钟
+    "forecast": (3600, 3 * 3600)  # 预报 1 小时
+}
 
 
 class WeatherData(BaseModel):
@@ -32,9 +68,76 @@ class WeatherData(BaseModel):
 class WeatherAPI:
     """天气查询 API"""
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, cache: Optional[TTLCache] = None,
+                 flight: Optional[SingleFlight] = None, geocache: Optional[GeoCache] = None,
+                 scoring: Optional[ScoringModel] = None, client: Optional[httpx.AsyncClient] = None,
+                 breaker: Optional[CircuitBreaker] = None):
         self.api_key = api_key or API_KEY
-        self.client = httpx.AsyncClient(timeout=10.0)
+        # 默认使用进程内共享的连接池，由 http_clients() / close_clients() 统一关闭
+        self._client = client
+        # 默认使用进程内共享缓存，CLI 和 Agent 工具创建的实例共用
+        self.cache = cache if cache is not None else get_shared_cache("weather")
+        # 相同请求并发时只发一次 HTTP 请求
+        self.flight = flight if flight is not None else get_shared_flight("weather")
+        # 城市名 -> 城市 ID / 经纬度，首次按名称查询成功后持久化
+        self.geocache = geocache if geocache is not None else get_shared_geocache()
+        # 出行日评分模型
+        self.scoring = scoring or ScoringModel()
+        # OpenWeatherMap 故障时熔断，直接返回缓存或模拟数据
+        self.breaker = breaker if breaker is not None else get_breaker("openweathermap")
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._client if self._client is not None else get_client("weather")
+
+    def _city_id(self, city: str) -> Optional[int]:
+        location = self.geocache.get(city)
+        if location is not None:
+            return location.city_id
+        return CITY_IDS.get(city)
+
+    def _location_params(self, city: str) -> Dict[str, Any]:
+        """已解析的城市按 ID 查询，否则按名称查询"""
+        city_id = self._city_id(city)
+        return {"id": city_id} if city_id is not None else {"q": city}
+
+    def _cache_key(self, endpoint: str, city: str, days: Optional[int] = None) -> tuple:
+        return (endpoint, city, UNITS, LANG, days)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """缓存命中统计"""
+        return dict(self.cache.stats.to_dict(), size=len(self.cache))
+
+    def coalescing_stats(self) -> Dict[str, int]:
+        """请求合并统计：coalesced 为复用了其他调用结果的次数"""
+        return self.flight.stats()
+
+    def breaker_state(self) -> Dict[str, Any]:
+        """熔断器状态：state 为 closed / open / half_open"""
+        return self.breaker.snapshot()
+
+    async def _get(self, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """经熔断器请求 OpenWeatherMap，返回 JSON"""
+        async def request():
+            response = await self.client.get(f"{BASE_URL}/{endpoint}", params=params)
+            response.raise_for_status()
+            return response.json()
+
+        return await self.breaker.call(request)
+
+    def _fallback(self, key: tuple, mock):
+        """请求失败或熔断时的降级：优先返回过期缓存，没有则返回模拟数据"""
+        cached = self.cache.get(key, allow_stale=True)
+        return cached if cached is not None else mock()
+
+    async def _cached(self, key: tuple, fetch, endpoint: str, record_stats: bool = True):
+        """缓存 + 请求合并：缓存未命中时，相同 key 的并发请求共享一次 HTTP 调用"""
+        return await self.cache.get_or_load(
+            key,
+            lambda: self.flight.do(key, fetch),
+            *CACHE_TTL[endpoint],
+            record_stats=record_stats
+        )
 
     async def get_weather(self, city: str) -> WeatherData:
         """
@@ -46,43 +149,155 @@ class WeatherAPI:
         Returns:
             WeatherData 天气数据
         """
+        return await self._get_weather(city)
+
+    async def _get_weather(self, city: str, record_stats: bool = True) -> WeatherData:
+        key = self._cache_key("weather", city)
         try:
-            # 调用 OpenWeatherMap API
-            params = {
-                "q": city,
-                "appid": self.api_key,
-                "units": "metric",
-                "lang": "zh_cn"
-            }
+            return await self._cached(key, lambda: self._fetch_weather(city), "weather",
+                                      record_stats=record_stats)
 
-            response = await self.client.get(f"{BASE_URL}/weather", params=params)
-            response.raise_for_status()
+        except FixtureNotFound:
+            # 回放缺少录制时直接报错，不用模拟数据掩盖
+            raise
+        except Exception as e:
+            # API 调用失败或熔断中，返回过期缓存或模拟数据
+            return self._fallback(key, lambda: self._get_mock_weather(city))
+
+    async def _fetch_weather(self, city: str) -> WeatherData:
+        """请求 OpenWeatherMap 当前天气（失败时抛出异常，不缓存）"""
+        params = {
+            **self._location_params(city),
+            "appid": self.api_key,
+            "units": UNITS,
+            "lang": LANG
+        }
 
-            data = response.json()
-
-            # 解析响应
-            weather = WeatherData(
-                city=data.get("name", city),
-                condition=data.get("weather", [{}])[0].get("main", "未知"),
-                temperature=data.get("main", {}).get("temp", 0),
-                temp_high=data.get("main", {}).get("temp_max", 0),
-                temp_low=data.get("main", {}).get("temp_min", 0),
-                humidity=data.get("main", {}).get("humidity", 0),
-                wind_speed=data.get("wind", {}).get("speed", 0),
-                pressure=data.get("main", {}).get("pressure", 0),
-                description=data.get("weather", [{}])[0].get("description", ""),
-                date=datetime.now(),
-                source="OpenWeatherMap"
-            )
+        data = await self._get("weather", params)
+        if self.geocache.get(city) is None:
+            self.geocache.put_from_weather(city, data)
 
-            return weather
+        return self._parse_weather(data, city)
 
-        except httpx.HTTPError as e:
-            # 如果 API 调用失败，返回模拟数据
-            return self._get_mock_weather(city)
-        except Exception as e:
-            # 其他错误也返回模拟数据
-            return self._get_mock_weather(city)
+    def _parse_weather(self, data: Dict[str, Any], city: str) -> WeatherData:
+        """解析当前天气响应（/weather 或 /group 列表中的一项）"""
+        return WeatherData(
+            city=data.get("name", city),
+            condition=data.get("weather", [{}])[0].get("main", "未知"),
+            temperature=data.get("main", {}).get("temp", 0),
+            temp_high=data.get("main", {}).get("temp_max", 0),
+            temp_low=data.get("main", {}).get("temp_min", 0),
+            humidity=data.get("main", {}).get("humidity", 0),
+            wind_speed=data.get("wind", {}).get("speed", 0),
+            pressure=data.get("main", {}).get("pressure", 0),
+            description=data.get("weather", [{}])[0].get("description", ""),
+            date=datetime.now(),
+            source="OpenWeatherMap"
+        )
+
+    async def get_weather_many(self, cities: List[str]) -> List[WeatherData]:
+        """
+        批量获取当前天气
+
+        已知城市 ID 的城市通过 group 接口每 20 个一次请求，其余城市逐个查询；
+        各批请求并发进行但不超过 GROUP_CONCURRENCY；缓存命中的城市不发请求
+
+        Args:
+            cities: 城市名称列表
+
+        Returns:
+            List[WeatherData] 与 cities 顺序一致
+        """
+        results: Dict[str, WeatherData] = {}
+        by_id: Dict[int, List[str]] = {}  # 别名或大小写不同的名称可能解析到同一个城市 ID
+        by_name: List[str] = []
+
+        for city in dict.fromkeys(cities):
+            # 每个城市在这里计一次命中或未命中，后续加载不再重复统计
+            cached = self.cache.get(self._cache_key("weather", city), record_stats=True)
+            if cached is not None:
+                results[city] = cached
+            elif self._city_id(city) is not None:
+                by_id.setdefault(self._city_id(city), []).append(city)
+            else:
+                by_name.append(city)
+
+        semaphore = asyncio.Semaphore(GROUP_CONCURRENCY)
+
+        async def fetch_chunk(ids: List[int]):
+            async with semaphore:
+                try:
+                    weathers = await self._fetch_group(ids, by_id)
+                except FixtureNotFound:
+                    raise
+                except Exception:
+                    weathers = {}
+            for city_id in ids:
+                for city in by_id[city_id]:
+                    if city in weathers:
+                        results[city] = weathers[city]
+                    else:
+                        # group 请求失败或缺少该城市，单独查询（失败时返回模拟数据）
+                        results[city] = await self._get_weather(city, record_stats=False)
+
+        async def fetch_one(city: str):
+            async with semaphore:
+                results[city] = await self._get_weather(city, record_stats=False)
+
+        ids = list(by_id)
+        await asyncio.gather(
+            *(fetch_chunk(ids[i:i + GROUP_CHUNK_SIZE]) for i in range(0, len(ids), GROUP_CHUNK_SIZE)),
+            *(fetch_one(city) for city in by_name)
+        )
+
+        return [results[city] for city in cities]
+
+    async def _fetch_group(self, ids: List[int], names: Dict[int, List[str]]) -> Dict[str, WeatherData]:
+        """请求 group 接口，结果按城市名（同一 ID 的每个名称）写入缓存"""
+        params = {
+            "id": ",".join(str(city_id) for city_id in ids),
+            "appid": self.api_key,
+            "units": UNITS,
+            "lang": LANG
+        }
+
+        data = await self._get("group", params)
+
+        weathers = {}
+        for item in data.get("list", []):
+            for city in names.get(item.get("id"), []):
+                weather = self._parse_weather(item, city)
+                self.cache.set(self._cache_key("weather", city), weather, *CACHE_TTL["weather"])
+                weathers[city] = weather
+        return weathers
+
+    async def warm_up(self, cities: Optional[List[str]] = None) -> Dict[str, Optional[int]]:
+        """
+        预热地理编码缓存：解析尚未缓存的城市
+
+        Args:
+            cities: 城市列表，默认 CITY_IDS 中的常用目的地
+
+        Returns:
+            Dict[str, Optional[int]] 城市 -> 城市 ID（解析失败为 None）
+        """
+        cities = list(cities or CITY_IDS)
+        semaphore = asyncio.Semaphore(GROUP_CONCURRENCY)
+
+        async def resolve(city: str) -> Optional[int]:
+            if self.geocache.get(city) is None:
+                async with semaphore:
+                    try:
+                        await self._fetch_weather(city)
+                    except FixtureNotFound:
+                        raise
+                    except Exception:
+                        return None
+            location = self.geocache.get(city)
+            return location.city_id if location else None
+
+        ids = await asyncio.gather(*(resolve(city) for city in cities))
+        return dict(zip(cities, ids))
 
     async def get_forecast(self, city: str, days: int = 5) -> Dict[str, Any]:
         """
@@ -95,46 +310,57 @@ class WeatherAPI:
         Returns:
             Dict[str, Any] 天气预报数据
         """
+        key = self._cache_key("forecast", city, days)
         try:
-            # 调用 OpenWeatherMap Forecast API
-            params = {
-                "q": city,
-                "appid": self.api_key,
-                "units": "metric",
-                "cnt": days * 8,  # 每 3 小时一次，8 个数据点/天
-                "lang": "zh_cn"
-            }
+            return await self._cached(key, lambda: self._fetch_forecast(city, days), "forecast")
 
-            response = await self.client.get(f"{BASE_URL}/forecast", params=params)
-            response.raise_for_status()
+        except FixtureNotFound:
+            raise
+        except Exception as e:
+            # API 调用失败或熔断中，返回过期缓存或模拟数据
+            return self._fallback(key, lambda: self._get_mock_forecast(city, days))
+
+    async def _fetch_forecast(self, city: str, days: int) -> Dict[str, Any]:
+        """请求 OpenWeatherMap 天气预报（失败时抛出异常，不缓存）"""
+        params = {
+            **self._location_params(city),
+            "appid": self.api_key,
+            "units": UNITS,
+            "cnt": days * 8,  # 每 3 小时一次，8 个数据点/天
+            "lang": LANG
+        }
+
+        data = await self._get("forecast", params)
+        city_info = data.get("city", {})
+        if self.geocache.get(city) is None and city_info.get("id"):
+            self.geocache.put_from_weather(city, {
+                "id": city_info["id"],
+                "coord": city_info.get("coord", {}),
+                "name": city_info.get("name", ""),
+                "sys": {"country": city_info.get("country", "")}
+            })
 
-            data = response.json()
-
-            # 解析响应
-            forecast_list = []
-            for item in data.get("list", []):
-                forecast = {
-                    "date": datetime.fromtimestamp(item["dt"]),
-                    "temperature": item["main"]["temp"],
-                    "temp_high": item["main"]["temp_max"],
-                    "temp_low": item["main"]["temp_min"],
-                    "humidity": item["main"]["humidity"],
-                    "condition": item["weather"][0]["main"],
-                    "description": item["weather"][0]["description"]
-                }
-                forecast_list.append(forecast)
-
-            return {
-                "city": data.get("city", {}).get("name", city),
-                "forecast": forecast_list
+        # 解析响应
+        forecast_list = []
+        for item in data.get("list", []):
+            forecast = {
+                "date": datetime.fromtimestamp(item["dt"]),
+                "temperature": item["main"]["temp"],
+                "temp_high": item["main"]["temp_max"],
+                "temp_low": item["main"]["temp_min"],
+                "humidity": item["main"]["humidity"],
+                "pressure": item["main"].get("pressure", 0),
+                "wind_speed": item.get("wind", {}).get("speed", 0),
+                "condition": item["weather"][0]["main"],
+                "description": item["weather"][0]["description"]
             }
+            forecast_list.append(forecast)
 
-        except httpx.HTTPError as e:
-            # 如果 API 调用失败，返回模拟数据
-            return self._get_mock_forecast(city, days)
-        except Exception as e:
-            # 其他错误也返回模拟数据
-            return self._get_mock_forecast(city, days)
+        return {
+            "city": data.get("city", {}).get("name", city),
+            "forecast": forecast_list,
+            "source": "OpenWeatherMap"
+        }
 
     def _get_mock_weather(self, city: str) -> WeatherData:
         """获取模拟天气数据"""
@@ -190,6 +416,8 @@ class WeatherAPI:
                 "temp_high": base_weather.temp_high + temp_variation,
                 "temp_low": base_weather.temp_low + temp_variation,
                 "humidity": base_weather.humidity + (day % 5) * 2,
+                "pressure": base_weather.pressure,
+                "wind_speed": base_weather.wind_speed,
                 "condition": base_weather.condition,
                 "description": base_weather.description
             }
@@ -197,7 +425,8 @@ class WeatherAPI:
 
         return {
             "city": city,
-            "forecast": forecast_list
+            "forecast": forecast_list,
+            "source": "Mock"
         }
 
     def _get_weather_description(self, condition: str) -> str:
@@ -211,19 +440,34 @@ class WeatherAPI:
         }
         return descriptions.get(condition, "天气晴朗，适合户外活动")
 
-    async def get_travel_advice(self, city: str, days: int) -> Dict[str, Any]:
+    async def get_travel_advice(self, city: str, days: int,
+                                fresh_current: bool = False) -> Dict[str, Any]:
         """
         获取旅行建议
 
         Args:
             city: 目的地城市
             days: 旅行天数
+            fresh_current: 是否需要实时的当前天气；默认用预报中最近的时段代替
+                （预报为模拟数据时用模拟的当前天气），只发一次请求，为 True 时当前天气和预报并发请求
 
         Returns:
             Dict[str, Any] 旅行建议
         """
-        weather = await self.get_weather(city)
-        forecast = await self.get_forecast(city, days)
+        if fresh_current:
+            weather, forecast = await asyncio.gather(
+                self.get_weather(city),
+                self.get_forecast(city, days)
+            )
+        else:
+            forecast = await self.get_forecast(city, days)
+            if forecast.get("source") == "Mock":
+                # 模拟预报的各天带有人为的温度偏移，当前天气与 get_weather 的模拟数据保持一致
+                weather = self._get_mock_weather(city)
+            else:
+                weather = self._weather_from_forecast(forecast)
+                if weather is None:
+                    weather = await self.get_weather(city)
 
         # 生成建议
         advice = {
@@ -236,6 +480,27 @@ class WeatherAPI:
 
         return advice
 
+    def _weather_from_forecast(self, forecast: Dict[str, Any]) -> Optional[WeatherData]:
+        """用预报中最近的时段作为当前天气（预报为空时返回 None）"""
+        slots = forecast.get("forecast", [])
+        if not slots:
+            return None
+        slot = slots[0]
+
+        return WeatherData(
+            city=forecast.get("city", ""),
+            condition=slot["condition"],
+            temperature=slot["temperature"],
+            temp_high=slot["temp_high"],
+            temp_low=slot["temp_low"],
+            humidity=slot["humidity"],
+            wind_speed=slot.get("wind_speed", 0),
+            pressure=slot.get("pressure", 0),
+            description=slot["description"],
+            date=slot["date"],
+            source=forecast.get("source", "OpenWeatherMap")
+        )
+
     def _generate_tips(self, weather: WeatherData, forecast: Dict) -> List[str]:
         """生成旅行贴士"""
         tips = []
@@ -284,80 +549,42 @@ class WeatherAPI:
 
         return clothing
 
-    def _find_best_days(self, forecast: Dict) -> List[Dict[str, Any]]:
-        """找出最适合旅游的几天"""
-        forecast_list = forecast.get("forecast", [])
-
-        # 按照温度和天气条件评分
-        scored_days = []
-        for day_data in forecast_list:
-            score = 0
-
-            # 温度评分（15-25°C 最好）
-            temp = day_data["temperature"]
-            if 15 <= temp <= 25:
-                score += 10
-            elif 10 <= temp < 15 or 25 < temp <= 30:
-                score += 5
-            else:
-                score += 0
-
-            # 天气状况评分（晴 > 多云 > 阴 > 雨 > 雪）
-            condition = day_data["condition"]
-            if condition == "晴":
-                score += 10
-            elif condition == "多云":
-                score += 7
-            elif condition == "阴":
-                score += 5
-            elif condition == "雨":
-                score += 2
-            elif condition == "雪":
-                score += 1
-
-            # 湿度评分（40-70% 最好）
-            humidity = day_data["humidity"]
-            if 40 <= humidity <= 70:
-                score += 5
-            else:
-                score += 2
-
-            scored_days.append({
-                "date": day_data["date"],
-                "score": score,
-                "weather": day_data
-            })
-
-        # 排序并返回前 3 天
-        sorted_days = sorted(scored_days, key=lambda x: x["score"], reverse=True)
-        return sorted_days[:3]
-
-    async def close(self):
-        """关闭 HTTP 客户端"""
-        await self.client.aclose()
+    def _find_best_days(self, forecast: Dict, top_n: int = 3) -> List[Dict[str, Any]]:
+        """找出最适合旅游的几天（按天汇总后评分，每个日期只出现一次）"""
+        return best_days(forecast.get("forecast", []), self.scoring, top_n)
 
 
 # 使用示例
 async def example_usage():
     """使用示例"""
-    api = WeatherAPI()
+    async with http_clients():
+        api = WeatherAPI()
+
+        # 获取当前天气
+        weather = await api.get_weather("东京")
+        print(f"当前天气：{weather.condition}, 温度：{weather.temperature}°C")
 
-    # 获取当前天气
-    weather = await api.get_weather("东京")
-    print(f"当前天气：{weather.condition}, 温度：{weather.temperature}°C")
+        # 获取天气预报
+        forecast = await api.get_forecast("东京", days=5)
+        print(f"天气预报：{len(forecast['forecast'])} 天")
 
-    # 获取天气预报
-    forecast = await api.get_forecast("东京", days=5)
-    print(f"天气预报：{len(forecast['forecast'])} 天")
+        # 获取旅行建议
+        advice = await api.get_travel_advice("东京", days=5)
+        print(f"旅行建议：{advice}")
 
-    # 获取旅行建议
-    advice = await api.get_travel_advice("东京", days=5)
-    print(f"旅行建议：{advice}")
 
-    # 关闭连接
-    await api.close()
+async def warm_up_geocache(cities: List[str]):
+    """预热地理编码缓存并打印结果"""
+    async with http_clients():
+        api = WeatherAPI()
+        resolved = await api.warm_up(cities or None)
+        for city, city_id in resolved.items():
+            print(f"{city}: {city_id if city_id is not None else '解析失败'}")
 
 
 if __name__ == "__main__":
-    import asyncio
-    asyncio.run(example_usage())
+    # python weather_api.py warm-up [城市 ...]：预热常用目的地的地理编码缓存
+    if sys.argv[1:2] == ["warm-up"]:
+        asyncio.run(warm_up_geocache(sys.argv[2:]))
+    else:
+        asyncio.run(example_usage())
@@ -0,0 +1,172 @@
+"""
+响应缓存
+带过期时间（TTL）和容量上限（LRU 淘汰）的异步缓存，
+过期后的一段时间内先返回旧数据并在后台刷新（stale-while-revalidate）
+"""
+
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set
+
+DEFAULT_MAX_SIZE = 512
+
+
+class CacheStats:
+    """缓存命中统计"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.evictions = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        total = self.hits + self.stale_hits + self.misses
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.stale_hits) / total if total else 0.0
+        }
+
+
+class _Entry:
+    __slots__ = ("value", "fresh_until", "stale_until")
+
+    def __init__(self, value: Any, fresh_until: float, stale_until: float):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+
+class TTLCache:
+    """
+    TTL + LRU 异步缓存
+
+    - 未过期：直接返回（hit）
+    - 过期但在 stale_ttl 宽限期内：返回旧值，同时在后台刷新（stale hit）
+    - 其他情况：等待 loader 加载（miss）；loader 抛出的异常不缓存，直接向上抛
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_size = max_size
+        self.clock = clock
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._refreshing: Set[Hashable] = set()
+        self._background: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, allow_stale: bool = False,
+            record_stats: bool = False) -> Optional[Any]:
+        """只读缓存，不触发加载；默认只返回未过期的值，record_stats 时计入命中统计"""
+        entry = self._entries.get(key)
+        now = self.clock()
+        if entry is not None:
+            fresh = now < entry.fresh_until
+            if fresh or (allow_stale and now < entry.stale_until):
+                self._entries.move_to_end(key)
+                if record_stats:
+                    if fresh:
+                        self.stats.hits += 1
+                    else:
+                        self.stats.stale_hits += 1
+                return entry.value
+        if record_stats:
+            self.stats.misses += 1
+        return None
+
+    def set(self, key: Hashable, value: Any, ttl: float, stale_ttl: float = 0.0):
+        now = self.clock()
+        self._entries[key] = _Entry(value, now + ttl, now + ttl + stale_ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """删除一个键，key 为 None 时清空"""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                          ttl: float, stale_ttl: float = 0.0, record_stats: bool = True) -> Any:
+        """
+        读取缓存，未命中时调用 loader
+
+        Args:
+            key: 缓存键
+            loader: 无参协程函数，返回要缓存的值
+            ttl: 新鲜时间（秒）
+            stale_ttl: 过期后仍可返回旧值的宽限时间（秒）
+            record_stats: 是否计入命中统计（调用方已用 get 统计过时传 False）
+
+        Returns:
+            缓存值或 loader 的结果
+        """
+        entry = self._entries.get(key)
+        now = self.clock()
+
+        if entry is not None:
+            if now < entry.fresh_until:
+                self._entries.move_to_end(key)
+                if record_stats:
+                    self.stats.hits += 1
+                return entry.value
+            if now < entry.stale_until:
+                self._entries.move_to_end(key)
+                if record_stats:
+                    self.stats.stale_hits += 1
+                self._refresh_in_background(key, loader, ttl, stale_ttl)
+                return entry.value
+
+        if record_stats:
+            self.stats.misses += 1
+        value = await loader()
+        self.set(key, value, ttl, stale_ttl)
+        return value
+
+    def _refresh_in_background(self, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                               ttl: float, stale_ttl: float):
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        async def refresh():
+            try:
+                value = await loader()
+            except Exception:
+                # 刷新失败保留旧值，宽限期结束后自然失效
+                self.stats.refresh_errors += 1
+            else:
+                self.stats.refreshes += 1
+                self.set(key, value, ttl, stale_ttl)
+            finally:
+                self._refreshing.discard(key)
+
+        task = asyncio.get_running_loop().create_task(refresh())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+
+# 进程内共享的缓存（CLI 和 Agent 工具使用同一份）
+_shared_caches: Dict[str, TTLCache] = {}
+
+
+def get_shared_cache(name: str, max_size: int = DEFAULT_MAX_SIZE) -> TTLCache:
+    """按名称获取进程内共享缓存"""
+    cache = _shared_caches.get(name)
+    if cache is None:
+        cache = _shared_caches[name] = TTLCache(max_size=max_size)
+    return cache
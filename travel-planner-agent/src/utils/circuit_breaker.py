@@ -0,0 +1,166 @@
+"""
+熔断器
+外部服务连续出错时暂停调用，直接走降级数据，而不是每次都等满超时
+"""
+
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Tuple
+
+import httpx
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开，调用被直接拒绝"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} 熔断中，{retry_in:.0f} 秒后重试")
+        self.name = name
+        self.retry_in = retry_in
+
+
+def is_provider_failure(error: BaseException) -> bool:
+    """
+    是否算作服务端故障
+
+    连接/超时错误、5xx 和 429 计入失败率；其他 4xx（如城市不存在）是请求本身的问题，不计入
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status >= 500 or status == 429
+    return isinstance(error, (httpx.TransportError, TimeoutError))
+
+
+class CircuitBreaker:
+    """
+    按失败率熔断
+
+    - closed：正常调用；最近 window 秒内调用数达到 min_calls 且失败率 >= failure_rate 时打开
+    - open：直接抛出 CircuitOpenError；open_timeout 秒后进入半开
+    - half_open：只放行一个探测请求，成功则关闭，失败则重新打开
+    """
+
+    def __init__(self, name: str, failure_rate: float = 0.5, min_calls: int = 5,
+                 window: float = 60.0, open_timeout: float = 30.0,
+                 is_failure: Callable[[BaseException], bool] = is_provider_failure,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.open_timeout = open_timeout
+        self.is_failure = is_failure
+        self.clock = clock
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self.rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and self.clock() - self._opened_at >= self.open_timeout:
+            self._state = HALF_OPEN
+            self._probing = False
+        return self._state
+
+    def _trim(self, now: float):
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            self._outcomes.popleft()
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = self.clock()
+        self._probing = False
+        self._outcomes.clear()
+        self.times_opened += 1
+
+    def _record(self, ok: bool):
+        now = self.clock()
+        if self._state == HALF_OPEN:
+            if ok:
+                self._state = CLOSED
+                self._probing = False
+            else:
+                self._open()
+            return
+
+        self._outcomes.append((now, ok))
+        self._trim(now)
+        calls = len(self._outcomes)
+        failures = sum(1 for _, success in self._outcomes if not success)
+        if calls >= self.min_calls and failures / calls >= self.failure_rate:
+            self._open()
+
+    async def call(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        通过熔断器调用 fn
+
+        Args:
+            fn: 无参协程函数
+
+        Returns:
+            fn 的结果；熔断时抛出 CircuitOpenError，fn 的异常原样抛出
+        """
+        state = self.state
+        if state == OPEN or (state == HALF_OPEN and self._probing):
+            self.rejected += 1
+            retry_in = max(0.0, self.open_timeout - (self.clock() - self._opened_at))
+            raise CircuitOpenError(self.name, retry_in)
+        if state == HALF_OPEN:
+            self._probing = True
+
+        try:
+            result = await fn()
+        except Exception as e:
+            if self.is_failure(e):
+                self._record(False)
+            elif state == HALF_OPEN:
+                # 非服务端故障说明服务可达
+                self._record(True)
+            raise
+        except BaseException:
+            # 探测请求被取消，允许下一个请求继续探测
+            if state == HALF_OPEN:
+                self._probing = False
+            raise
+        self._record(True)
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        """监控用的状态快照"""
+        state = self.state
+        self._trim(self.clock())
+        failures = sum(1 for _, ok in self._outcomes if not ok)
+        return {
+            "name": self.name,
+            "state": state,
+            "calls_in_window": len(self._outcomes),
+            "failures_in_window": failures,
+            "rejected": self.rejected,
+            "times_opened": self.times_opened,
+            "retry_in": max(0.0, self.open_timeout - (self.clock() - self._opened_at))
+            if state == OPEN else 0.0
+        }
+
+
+# 进程内共享的熔断器（每个外部服务一个）
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """按服务名获取进程内共享的熔断器"""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(name)
+    return breaker
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    """所有熔断器的状态"""
+    return {name: breaker.snapshot() for name, breaker in _breakers.items()}
@@ -0,0 +1,225 @@
+"""
+天气预报按天聚合与评分
+把 3 小时一次的预报时段整理成按天的数组（最低/最高/平均气温、平均湿度、主要天气），
+再用评分模型一次性给所有日期打分
+"""
+
+from datetime import date, datetime
+from typing import Any, Dict, List, Tuple
+
+from pydantic import BaseModel, Field
+
+try:
+    import numpy as np
+except ImportError:  # 未安装 numpy 时用纯 Python 按同样规则聚合和评分
+    np = None
+
+HAS_NUMPY = np is not None
+
+
+class ScoringModel(BaseModel):
+    """
+    出行日评分模型
+
+    总分 = 气温分 + 天气分 + 湿度分；
+    OpenWeatherMap 返回英文天气（Clear/Clouds/...），模拟数据返回中文，两者都列出
+    """
+    ideal_temp: Tuple[float, float] = Field(default=(15, 25), description="最舒适气温区间")
+    ideal_temp_score: float = 10
+    ok_temp: Tuple[float, float] = Field(default=(10, 30), description="可接受气温区间")
+    ok_temp_score: float = 5
+    condition_scores: Dict[str, float] = Field(default_factory=lambda: {
+        "晴": 10, "Clear": 10,
+        "多云": 7, "Clouds": 7,
+        "阴": 5, "Mist": 5, "Haze": 5, "Fog": 5,
+        "雨": 2, "Drizzle": 2, "Rain": 2, "Thunderstorm": 1,
+        "雪": 1, "Snow": 1
+    })
+    default_condition_score: float = 0
+    ideal_humidity: Tuple[float, float] = Field(default=(40, 70), description="最舒适湿度区间")
+    ideal_humidity_score: float = 5
+    other_humidity_score: float = 2
+
+    def score_one(self, temperature: float, humidity: float, condition: str) -> float:
+        """单日评分（未安装 numpy 时使用，规则与 score_days 相同）"""
+        if self.ideal_temp[0] <= temperature <= self.ideal_temp[1]:
+            score = self.ideal_temp_score
+        elif self.ok_temp[0] <= temperature <= self.ok_temp[1]:
+            score = self.ok_temp_score
+        else:
+            score = 0
+        score += self.condition_scores.get(condition, self.default_condition_score)
+        if self.ideal_humidity[0] <= humidity <= self.ideal_humidity[1]:
+            score += self.ideal_humidity_score
+        else:
+            score += self.other_humidity_score
+        return score
+
+
+class DailyForecast:
+    """按天聚合后的预报，每个属性都是长度为天数的数组（未安装 numpy 时为列表）"""
+
+    def __init__(self, dates: List[date], temp_min, temp_max, temp_mean, humidity,
+                 condition, slot_count):
+        self.dates = dates
+        self.temp_min = temp_min
+        self.temp_max = temp_max
+        self.temp_mean = temp_mean
+        self.humidity = humidity
+        self.condition = condition
+        self.slot_count = slot_count
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def record(self, index: int) -> Dict[str, Any]:
+        """第 index 天的汇总（字段名与单个预报时段一致）"""
+        return {
+            "date": self.dates[index],
+            "condition": str(self.condition[index]),
+            "temperature": round(float(self.temp_mean[index]), 1),
+            "temp_high": round(float(self.temp_max[index]), 1),
+            "temp_low": round(float(self.temp_min[index]), 1),
+            "humidity": round(float(self.humidity[index])),
+            "slots": int(self.slot_count[index])
+        }
+
+
+def _slot_day(value: Any) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def aggregate_daily(slots: List[Dict[str, Any]]) -> DailyForecast:
+    """
+    把预报时段按日期聚合
+
+    Args:
+        slots: get_forecast 返回的 forecast 列表
+
+    Returns:
+        DailyForecast 按日期升序排列
+    """
+    if np is None:
+        return _aggregate_daily_python(slots)
+
+    days = np.array([_slot_day(slot["date"]).toordinal() for slot in slots], dtype=np.int64)
+    temp = np.array([slot["temperature"] for slot in slots], dtype=float)
+    high = np.array([slot.get("temp_high", slot["temperature"]) for slot in slots], dtype=float)
+    low = np.array([slot.get("temp_low", slot["temperature"]) for slot in slots], dtype=float)
+    humidity = np.array([slot["humidity"] for slot in slots], dtype=float)
+    conditions = np.array([slot["condition"] for slot in slots], dtype=object)
+
+    unique_days, day_index = np.unique(days, return_inverse=True)
+    n_days = len(unique_days)
+    counts = np.bincount(day_index, minlength=n_days)
+
+    temp_min = np.full(n_days, np.inf)
+    np.minimum.at(temp_min, day_index, low)
+    temp_max = np.full(n_days, -np.inf)
+    np.maximum.at(temp_max, day_index, high)
+    temp_mean = np.bincount(day_index, weights=temp, minlength=n_days) / counts
+    humidity_mean = np.bincount(day_index, weights=humidity, minlength=n_days) / counts
+
+    # 主要天气：每天出现次数最多的天气（并列时取先出现的）
+    unique_conditions, condition_index = np.unique(conditions.astype(str), return_inverse=True)
+    tally = np.zeros((n_days, len(unique_conditions)), dtype=np.int64)
+    np.add.at(tally, (day_index, condition_index), 1)
+    first_seen = np.full((n_days, len(unique_conditions)), len(slots), dtype=np.int64)
+    np.minimum.at(first_seen, (day_index, condition_index), np.arange(len(slots)))
+    dominant = np.argmax(tally * (len(slots) + 1) - first_seen, axis=1)
+
+    return DailyForecast(
+        dates=[date.fromordinal(int(day)) for day in unique_days],
+        temp_min=temp_min,
+        temp_max=temp_max,
+        temp_mean=temp_mean,
+        humidity=humidity_mean,
+        condition=unique_conditions[dominant],
+        slot_count=counts
+    )
+
+
+def _aggregate_daily_python(slots: List[Dict[str, Any]]) -> DailyForecast:
+    """aggregate_daily 的纯 Python 版本"""
+    by_day: Dict[date, List[Tuple[int, Dict[str, Any]]]] = {}
+    for position, slot in enumerate(slots):
+        by_day.setdefault(_slot_day(slot["date"]), []).append((position, slot))
+
+    dates = sorted(by_day)
+    temp_min, temp_max, temp_mean, humidity, condition, slot_count = [], [], [], [], [], []
+    for day in dates:
+        day_slots = [slot for _, slot in by_day[day]]
+        temp_min.append(min(float(slot.get("temp_low", slot["temperature"])) for slot in day_slots))
+        temp_max.append(max(float(slot.get("temp_high", slot["temperature"])) for slot in day_slots))
+        temp_mean.append(sum(float(slot["temperature"]) for slot in day_slots) / len(day_slots))
+        humidity.append(sum(float(slot["humidity"]) for slot in day_slots) / len(day_slots))
+        slot_count.append(len(day_slots))
+
+        # 主要天气：出现次数最多，并列时取先出现的
+        tally: Dict[str, List[int]] = {}
+        for position, slot in by_day[day]:
+            entry = tally.setdefault(str(slot["condition"]), [0, position])
+            entry[0] += 1
+        condition.append(max(tally, key=lambda c: (tally[c][0], -tally[c][1])))
+
+    return DailyForecast(dates, temp_min, temp_max, temp_mean, humidity, condition, slot_count)
+
+
+def score_days(daily: DailyForecast, model: ScoringModel):
+    """
+    一次性给所有日期打分
+
+    Args:
+        daily: aggregate_daily 的结果
+        model: 评分模型
+
+    Returns:
+        每天的得分数组（未安装 numpy 时为列表）
+    """
+    if np is None:
+        return [
+            model.score_one(daily.temp_mean[i], daily.humidity[i], daily.condition[i])
+            for i in range(len(daily))
+        ]
+
+    temp = daily.temp_mean
+    ideal_low, ideal_high = model.ideal_temp
+    ok_low, ok_high = model.ok_temp
+    temp_score = np.where(
+        (temp >= ideal_low) & (temp <= ideal_high), model.ideal_temp_score,
+        np.where((temp >= ok_low) & (temp <= ok_high), model.ok_temp_score, 0.0)
+    )
+
+    # 每种天气只查一次评分表，再按下标展开
+    unique_conditions, condition_index = np.unique(daily.condition, return_inverse=True)
+    table = np.array([model.condition_scores.get(str(c), model.default_condition_score)
+                      for c in unique_conditions], dtype=float)
+    condition_score = table[condition_index]
+
+    humidity = daily.humidity
+    humidity_low, humidity_high = model.ideal_humidity
+    humidity_score = np.where(
+        (humidity >= humidity_low) & (humidity <= humidity_high),
+        model.ideal_humidity_score, model.other_humidity_score
+    )
+
+    return temp_score + condition_score + humidity_score
+
+
+def best_days(slots: List[Dict[str, Any]], model: ScoringModel, top_n: int = 3) -> List[Dict[str, Any]]:
+    """
+    按天评分并返回得分最高的 top_n 个不同日期
+
+    Returns:
+        List[Dict] 每项包含 date、score、weather（当天汇总）
+    """
+    if not slots:
+        return []
+    daily = aggregate_daily(slots)
+    scores = score_days(daily, model)
+    # 稳定排序：同分时较早的日期在前
+    order = sorted(range(len(daily)), key=lambda i: -scores[i])[:top_n]
+    return [
+        {"date": daily.dates[i], "score": float(scores[i]), "weather": daily.record(i)}
+        for i in order
+    ]
@@ -0,0 +1,128 @@
+"""
+城市地理编码缓存
+把用户输入的城市名解析为 OpenWeatherMap 城市 ID、经纬度和规范名称并持久化（SQLite），
+之后的天气查询直接按 ID 请求，不再让服务端反复解析中文城市名
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel
+
+# 默认缓存文件：项目目录下 data/geocode.sqlite，可用环境变量覆盖
+DEFAULT_DB_PATH = os.getenv(
+    "WEATHER_GEOCODE_DB",
+    str(Path(__file__).resolve().parents[2] / "data" / "geocode.sqlite")
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cities (
+    query TEXT PRIMARY KEY,
+    city_id INTEGER NOT NULL,
+    lat REAL,
+    lon REAL,
+    name TEXT,
+    country TEXT,
+    updated_at REAL
+)
+"""
+
+
+class CityLocation(BaseModel):
+    """城市解析结果"""
+    query: str
+    city_id: int
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    name: str = ""
+    country: str = ""
+
+
+class GeoCache:
+    """
+    城市名 -> CityLocation 的持久化缓存
+
+    读操作先查内存字典，首次读取某个城市时才访问 SQLite
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._memory: Dict[str, Optional[CityLocation]] = {}
+        self._lock = threading.Lock()
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(SCHEMA)
+        self._conn.commit()
+
+    @staticmethod
+    def _normalize(query: str) -> str:
+        return query.strip().lower()
+
+    def get(self, query: str) -> Optional[CityLocation]:
+        """查询已解析的城市，未解析过返回 None"""
+        key = self._normalize(query)
+        with self._lock:
+            if key in self._memory:
+                return self._memory[key]
+            row = self._conn.execute(
+                "SELECT city_id, lat, lon, name, country FROM cities WHERE query = ?", (key,)
+            ).fetchone()
+            location = None
+            if row is not None:
+                location = CityLocation(query=key, city_id=row[0], lat=row[1], lon=row[2],
+                                        name=row[3] or "", country=row[4] or "")
+            self._memory[key] = location
+            return location
+
+    def put(self, query: str, location: CityLocation):
+        key = self._normalize(query)
+        location = location.model_copy(update={"query": key})
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cities (query, city_id, lat, lon, name, country, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, location.city_id, location.lat, location.lon, location.name,
+                 location.country, time.time())
+            )
+            self._conn.commit()
+            self._memory[key] = location
+
+    def put_from_weather(self, query: str, data: Dict[str, Any]) -> Optional[CityLocation]:
+        """从 /weather 响应中提取城市 ID、坐标和名称并保存"""
+        if not data.get("id"):
+            return None
+        coord = data.get("coord", {})
+        location = CityLocation(
+            query=query,
+            city_id=data["id"],
+            lat=coord.get("lat"),
+            lon=coord.get("lon"),
+            name=data.get("name", ""),
+            country=data.get("sys", {}).get("country", "")
+        )
+        self.put(query, location)
+        return location
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cities").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_shared_geocache: Optional[GeoCache] = None
+
+
+def get_shared_geocache() -> GeoCache:
+    """进程内共享的地理编码缓存"""
+    global _shared_geocache
+    if _shared_geocache is None:
+        _shared_geocache = GeoCache()
+    return _shared_geocache
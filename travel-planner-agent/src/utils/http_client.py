@@ -0,0 +1,159 @@
+"""
+共享 HTTP 客户端
+每个外部 API 在进程内只保留一个 httpx.AsyncClient（连接池 + keep-alive），
+所有 WeatherAPI / CurrencyAPI 实例共用，避免每次会话都重新建连和 TLS 握手
+"""
+
+import asyncio
+import importlib.util
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from pydantic import BaseModel
+
+from utils.replay_transport import TransportWrapper, wrapper_from_env
+
+# 安装了 h2 才能启用 HTTP/2
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class ClientConfig(BaseModel):
+    """单个 API 的客户端参数"""
+    timeout: float = 10.0
+    connect_timeout: float = 3.0
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    http2: bool = True  # h2 未安装时自动退回 HTTP/1.1
+
+    def transport(self) -> httpx.AsyncHTTPTransport:
+        """带连接池参数的底层传输层"""
+        return httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry
+            ),
+            http2=self.http2 and HTTP2_AVAILABLE
+        )
+
+    def build(self, transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            transport=transport or self.transport()
+        )
+
+
+# 各 API 的默认参数：天气接口并发较多（批量查询），汇率接口请求少、超时短
+CLIENT_CONFIGS: Dict[str, ClientConfig] = {
+    "weather": ClientConfig(timeout=10.0, max_connections=20, max_keepalive_connections=10),
+    "currency": ClientConfig(timeout=8.0, max_connections=5, max_keepalive_connections=2),
+}
+
+
+class ClientRegistry:
+    """
+    按名称管理共享客户端
+
+    httpx 的连接绑定在创建它的事件循环上；在新的事件循环里（如多次 asyncio.run）
+    请求同一个名称时会重新创建客户端；被替换的旧客户端放入待关闭列表，由 aclose 关闭
+    """
+
+    def __init__(self, configs: Optional[Dict[str, ClientConfig]] = None,
+                 transport_wrapper: Optional[TransportWrapper] = None):
+        self.configs = dict(configs or CLIENT_CONFIGS)
+        self.transport_wrapper = transport_wrapper
+        self._clients: Dict[str, Tuple[httpx.AsyncClient, Optional[asyncio.AbstractEventLoop]]] = {}
+        self._retired: List[Tuple[httpx.AsyncClient, Optional[asyncio.AbstractEventLoop]]] = []
+
+    def _retire(self, name: str):
+        """把名称对应的客户端移入待关闭列表（已关闭的直接丢弃）"""
+        entry = self._clients.pop(name, None)
+        if entry is not None and not entry[0].is_closed:
+            self._retired.append(entry)
+
+    def configure(self, name: str, config: ClientConfig):
+        """修改某个 API 的参数，下次 get 时按新参数创建"""
+        self.configs[name] = config
+        self._retire(name)
+
+    def set_transport_wrapper(self, wrapper: Optional[TransportWrapper]):
+        """替换传输层包装，已创建的客户端在下次 get 时重建"""
+        self.transport_wrapper = wrapper
+        for name in list(self._clients):
+            self._retire(name)
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        """获取（必要时创建）名称对应的客户端"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        entry = self._clients.get(name)
+        if entry is not None:
+            client, client_loop = entry
+            if not client.is_closed and (client_loop is None or client_loop is loop):
+                if client_loop is None:
+                    self._clients[name] = (client, loop)
+                return client
+            self._retire(name)
+
+        config = self.configs.get(name, ClientConfig())
+        transport = config.transport()
+        if self.transport_wrapper is not None:
+            transport = self.transport_wrapper(name, transport)
+        client = config.build(transport)
+        self._clients[name] = (client, loop)
+        return client
+
+    async def aclose(self):
+        """关闭当前事件循环中创建的所有客户端（包括被替换下来的旧客户端）"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        entries = list(self._clients.values()) + self._retired
+        self._clients, self._retired = {}, []
+        for client, client_loop in entries:
+            if client.is_closed:
+                continue
+            if client_loop is None or client_loop is loop:
+                await client.aclose()
+            elif not client_loop.is_closed():
+                # 其他仍在运行的事件循环创建的客户端留给那个循环关闭
+                self._retired.append((client, client_loop))
+
+
+# 设置了 TRAVEL_API_FIXTURES 时所有共享客户端走录制/回放
+_registry = ClientRegistry(transport_wrapper=wrapper_from_env())
+
+
+def get_registry() -> ClientRegistry:
+    return _registry
+
+
+def get_client(name: str) -> httpx.AsyncClient:
+    """按 API 名称获取进程内共享的客户端"""
+    return _registry.get(name)
+
+
+async def close_clients():
+    """关闭所有共享客户端（程序退出前调用）"""
+    await _registry.aclose()
+
+
+@asynccontextmanager
+async def http_clients():
+    """
+    共享客户端的生命周期
+
+    用法：
+        async with http_clients():
+            await WeatherAPI().get_weather("东京")
+    """
+    try:
+        yield _registry
+    finally:
+        await close_clients()
@@ -0,0 +1,189 @@
+"""
+汇率表
+加载一次基础报价，预先算好所有货币两两之间的汇率（N×N 矩阵），
+查询时只做字典/数组读取；到期后整体重建并一次性替换，读者不会看到半新半旧的表
+"""
+
+import time
+from datetime import datetime
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # 未安装 numpy 时 matrix 为嵌套列表
+    np = None
+
+# 没有直接报价时依次尝试的中间货币
+PIVOT_CURRENCIES = ("USD", "EUR")
+
+DEFAULT_REFRESH_INTERVAL = 3600.0
+
+Quotes = Dict[str, Dict[str, Decimal]]
+
+
+def load_mock_quotes() -> Quotes:
+    """常用货币对报价（参考 2026 年汇率）"""
+    return {
+        "CNY": {
+            "USD": Decimal("0.138"),
+            "JPY": Decimal("20.5"),
+            "EUR": Decimal("0.127"),
+            "GBP": Decimal("0.110"),
+            "KRW": Decimal("185.5"),
+            "HKD": Decimal("1.075"),
+            "SGD": Decimal("0.188"),
+            "AUD": Decimal("0.210"),
+            "CAD": Decimal("0.188")
+        },
+        "USD": {
+            "CNY": Decimal("7.246"),
+            "JPY": Decimal("148.5"),
+            "EUR": Decimal("0.921"),
+            "GBP": Decimal("0.797"),
+            "KRW": Decimal("1344.2"),
+            "HKD": Decimal("7.789"),
+            "SGD": Decimal("1.361"),
+            "AUD": Decimal("1.522"),
+            "CAD": Decimal("1.361")
+        },
+        "JPY": {
+            "CNY": Decimal("0.0488"),
+            "USD": Decimal("0.00673"),
+            "EUR": Decimal("0.00621"),
+            "GBP": Decimal("0.00537"),
+            "KRW": Decimal("9.052"),
+            "HKD": Decimal("0.0524"),
+            "SGD": Decimal("0.00917"),
+            "AUD": Decimal("0.01025"),
+            "CAD": Decimal("0.00917")
+        },
+        "EUR": {
+            "CNY": Decimal("7.874"),
+            "USD": Decimal("1.086"),
+            "JPY": Decimal("161.2"),
+            "GBP": Decimal("0.866"),
+            "KRW": Decimal("1459.3"),
+            "HKD": Decimal("8.462"),
+            "SGD": Decimal("1.478"),
+            "AUD": Decimal("1.653"),
+            "CAD": Decimal("1.478")
+        }
+    }
+
+
+class RateSnapshot:
+    """某一时刻的完整汇率表（创建后不再修改）"""
+
+    def __init__(self, quotes: Quotes, source: str):
+        self.source = source
+        self.loaded_at = datetime.now()
+        currencies = set(quotes)
+        for targets in quotes.values():
+            currencies.update(targets)
+        self.currencies: List[str] = sorted(currencies)
+        self.index: Dict[str, int] = {code: i for i, code in enumerate(self.currencies)}
+        self.rates: Dict[Tuple[str, str], Decimal] = self._cross_rates(quotes)
+        self.inverse: Dict[Tuple[str, str], Decimal] = {
+            pair: Decimal(1) / rate for pair, rate in self.rates.items()
+        }
+
+        # 数组形式：matrix[index[from]][index[to]]，缺失的货币对为 nan
+        size = len(self.currencies)
+        rows = [[float("nan")] * size for _ in range(size)]
+        for (from_currency, to_currency), rate in self.rates.items():
+            rows[self.index[from_currency]][self.index[to_currency]] = float(rate)
+        self.matrix = np.array(rows, dtype=float) if np is not None else rows
+
+    def _cross_rates(self, quotes: Quotes) -> Dict[Tuple[str, str], Decimal]:
+        # 1. 直接报价，其次用反向报价求倒数
+        known: Dict[Tuple[str, str], Decimal] = {}
+        for from_currency, targets in quotes.items():
+            for to_currency, rate in targets.items():
+                if rate > 0:
+                    known[(from_currency, to_currency)] = rate
+        for (from_currency, to_currency), rate in list(known.items()):
+            known.setdefault((to_currency, from_currency), Decimal(1) / rate)
+
+        # 2. 仍然缺失的货币对经 USD / EUR 三角换算
+        rates = dict(known)
+        for from_currency in self.currencies:
+            rates[(from_currency, from_currency)] = Decimal("1.0")
+            for to_currency in self.currencies:
+                if (from_currency, to_currency) in rates:
+                    continue
+                for pivot in PIVOT_CURRENCIES:
+                    first = known.get((from_currency, pivot))
+                    second = known.get((pivot, to_currency))
+                    if first is not None and second is not None:
+                        rates[(from_currency, to_currency)] = first * second
+                        break
+        return rates
+
+
+class RateTable:
+    """
+    汇率查询表
+
+    - rate() / inverse_rate()：字典读取
+    - matrix / index：数组读取，适合批量换算
+    - 超过 refresh_interval 后，下一次查询会重新加载报价并整体替换快照
+    """
+
+    def __init__(self, loader: Callable[[], Quotes] = load_mock_quotes, source: str = "Mock",
+                 refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
+                 clock: Callable[[], float] = time.monotonic):
+        self.loader = loader
+        self.source = source
+        self.refresh_interval = refresh_interval
+        self.clock = clock
+        self.refreshes = 0
+        self._snapshot = RateSnapshot(loader(), source)
+        self._expires_at = clock() + refresh_interval
+
+    @property
+    def snapshot(self) -> RateSnapshot:
+        if self.clock() >= self._expires_at:
+            self.refresh()
+        return self._snapshot
+
+    def refresh(self) -> RateSnapshot:
+        """重新加载报价；加载失败时继续使用旧表，下个周期再试"""
+        self._expires_at = self.clock() + self.refresh_interval
+        try:
+            snapshot = RateSnapshot(self.loader(), self.source)
+        except Exception:
+            return self._snapshot
+        self._snapshot = snapshot
+        self.refreshes += 1
+        return snapshot
+
+    @property
+    def currencies(self) -> List[str]:
+        return self.snapshot.currencies
+
+    @property
+    def index(self) -> Dict[str, int]:
+        return self.snapshot.index
+
+    @property
+    def matrix(self):
+        return self.snapshot.matrix
+
+    def rate(self, from_currency: str, to_currency: str) -> Optional[Decimal]:
+        """汇率，表中没有的货币对返回 None"""
+        return self.snapshot.rates.get((from_currency, to_currency))
+
+    def inverse_rate(self, from_currency: str, to_currency: str) -> Optional[Decimal]:
+        return self.snapshot.inverse.get((from_currency, to_currency))
+
+
+_shared_table: Optional[RateTable] = None
+
+
+def get_shared_rate_table() -> RateTable:
+    """进程内共享的汇率表"""
+    global _shared_table
+    if _shared_table is None:
+        _shared_table = RateTable()
+    return _shared_table
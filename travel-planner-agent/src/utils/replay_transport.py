@@ -0,0 +1,203 @@
+"""
+外部 API 录制/回放
+作为 httpx 传输层挂到共享客户端上：录制模式把真实响应按请求保存到磁盘，
+回放模式直接读取保存的响应（可模拟网络延迟），测试和基准测试无需联网
+
+环境变量：
+    TRAVEL_API_FIXTURES  响应目录，设置后自动启用
+    TRAVEL_API_MODE      replay（默认）/ record / auto（有记录则回放，否则录制）
+    TRAVEL_API_LATENCY   回放延迟（秒），默认 0
+    TRAVEL_API_JITTER    回放延迟的随机抖动上限（秒），默认 0
+"""
+
+import os
+import json
+import base64
+import random
+import asyncio
+import hashlib
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlencode
+
+import httpx
+
+REPLAY = "replay"
+RECORD = "record"
+AUTO = "auto"
+
+# 不参与请求键、也不写入磁盘的查询参数
+SECRET_PARAMS = {"appid", "api_key", "apikey", "access_key", "app_id", "key"}
+
+# 响应体已解码保存，这些头不再适用
+DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+class FixtureNotFound(LookupError):
+    """
+    回放模式下没有对应的录制响应
+
+    不继承 httpx.TransportError：缺少录制是测试数据的问题而不是服务故障，
+    既不计入熔断，也不应被调用方的降级逻辑吞掉
+    """
+
+    def __init__(self, message: str, request: httpx.Request):
+        super().__init__(message)
+        self.request = request
+
+
+def request_key(request: httpx.Request) -> str:
+    """请求键：方法 + 地址 + 排序后的查询参数（去掉密钥）+ 请求体"""
+    params = sorted(
+        (k, v) for k, v in request.url.params.multi_items() if k.lower() not in SECRET_PARAMS
+    )
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(f"{request.url.host}{request.url.path}?{urlencode(params)}".encode())
+    digest.update(request.content or b"")
+    return digest.hexdigest()[:32]
+
+
+def _redacted_url(request: httpx.Request) -> str:
+    params = [(k, v) for k, v in request.url.params.multi_items() if k.lower() not in SECRET_PARAMS]
+    return str(request.url.copy_with(query=urlencode(params).encode() or None))
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """
+    录制/回放传输层
+
+    Args:
+        fixtures_dir: 响应保存目录（每个请求一个 JSON 文件）
+        upstream: 录制时真正发请求的传输层
+        mode: replay / record / auto
+        latency: 回放时每个请求的固定延迟（秒）
+        jitter: 回放延迟的随机抖动上限（秒）
+    """
+
+    def __init__(self, fixtures_dir: str, upstream: Optional[httpx.AsyncBaseTransport] = None,
+                 mode: str = REPLAY, latency: float = 0.0, jitter: float = 0.0):
+        if mode not in (REPLAY, RECORD, AUTO):
+            raise ValueError(f"未知的回放模式: {mode}")
+        self.fixtures_dir = fixtures_dir
+        self.upstream = upstream
+        self.mode = mode
+        self.latency = latency
+        self.jitter = jitter
+        self.replayed = 0
+        self.recorded = 0
+        self.missing = 0
+
+    def _path(self, request: httpx.Request) -> str:
+        return os.path.join(self.fixtures_dir, f"{request_key(request)}.json")
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        path = self._path(request)
+
+        if self.mode != RECORD and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                fixture = json.load(f)
+            delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.replayed += 1
+            return self._to_response(fixture, request)
+
+        if self.mode == REPLAY or self.upstream is None:
+            self.missing += 1
+            raise FixtureNotFound(f"没有录制的响应: {request.method} {_redacted_url(request)}",
+                                  request=request)
+
+        response = await self.upstream.handle_async_request(request)
+        try:
+            content = await response.aread()
+        finally:
+            await response.aclose()
+        self._save(path, request, response, content)
+        self.recorded += 1
+        return self._to_response(self._fixture(request, response, content), request)
+
+    def _fixture(self, request: httpx.Request, response: httpx.Response,
+                 content: bytes) -> Dict[str, Any]:
+        try:
+            body, encoding = content.decode("utf-8"), "text"
+        except UnicodeDecodeError:
+            body, encoding = base64.b64encode(content).decode("ascii"), "base64"
+        return {
+            "request": {"method": request.method, "url": _redacted_url(request)},
+            "status": response.status_code,
+            "headers": [[k, v] for k, v in response.headers.multi_items()
+                        if k.lower() not in DROP_HEADERS],
+            "body": body,
+            "encoding": encoding
+        }
+
+    def _save(self, path: str, request: httpx.Request, response: httpx.Response, content: bytes):
+        os.makedirs(self.fixtures_dir, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._fixture(request, response, content), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _to_response(fixture: Dict[str, Any], request: httpx.Request) -> httpx.Response:
+        body = fixture["body"]
+        content = base64.b64decode(body) if fixture.get("encoding") == "base64" else body.encode("utf-8")
+        return httpx.Response(
+            fixture["status"],
+            headers=[tuple(header) for header in fixture["headers"]],
+            content=content,
+            request=request
+        )
+
+    def stats(self) -> Dict[str, int]:
+        return {"replayed": self.replayed, "recorded": self.recorded, "missing": self.missing}
+
+    async def aclose(self):
+        if self.upstream is not None:
+            await self.upstream.aclose()
+
+
+# 包装共享客户端的底层传输层，参数为 API 名称和原始传输层
+TransportWrapper = Callable[[str, httpx.AsyncBaseTransport], httpx.AsyncBaseTransport]
+
+
+def replay_wrapper(fixtures_dir: str, mode: str = REPLAY, latency: float = 0.0,
+                   jitter: float = 0.0) -> TransportWrapper:
+    """为共享客户端生成传输层包装：每个 API 的响应存放在 fixtures_dir/<API 名称>/ 下"""
+    def wrap(name: str, upstream: httpx.AsyncBaseTransport) -> httpx.AsyncBaseTransport:
+        return ReplayTransport(os.path.join(fixtures_dir, name), upstream, mode, latency, jitter)
+    return wrap
+
+
+def wrapper_from_env() -> Optional[TransportWrapper]:
+    """根据环境变量启用录制/回放，未设置 TRAVEL_API_FIXTURES 时返回 None"""
+    fixtures_dir = os.getenv("TRAVEL_API_FIXTURES")
+    if not fixtures_dir:
+        return None
+    return replay_wrapper(
+        fixtures_dir,
+        mode=os.getenv("TRAVEL_API_MODE", REPLAY),
+        latency=float(os.getenv("TRAVEL_API_LATENCY", "0")),
+        jitter=float(os.getenv("TRAVEL_API_JITTER", "0"))
+    )
+
+
+@contextmanager
+def replaying(fixtures_dir: str, mode: str = REPLAY, latency: float = 0.0, jitter: float = 0.0):
+    """
+    在 with 块内让共享客户端走录制/回放
+
+    用法：
+        with replaying("fixtures/travel", latency=0.05):
+            asyncio.run(benchmark())
+    """
+    from utils.http_client import get_registry
+
+    registry = get_registry()
+    previous = registry.transport_wrapper
+    registry.set_transport_wrapper(replay_wrapper(fixtures_dir, mode, latency, jitter))
+    try:
+        yield registry
+    finally:
+        registry.set_transport_wrapper(previous)
@@ -0,0 +1,68 @@
+"""
+请求合并（single-flight）
+相同键的并发调用只执行一次，其余调用等待同一个结果
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    并发去重
+
+    第一个调用者启动任务，之后到达的相同键调用共享该任务的结果（或异常）；
+    任务以独立 Task 运行，某个调用者被取消不会影响其他等待者
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        执行 fn，同一键已有执行中的任务时直接等待它
+
+        Args:
+            key: 合并键（如城市名、货币对）
+            fn: 无参协程函数
+
+        Returns:
+            fn 的结果
+        """
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight)
+        }
+
+
+# 进程内共享的合并器
+_shared_flights: Dict[str, SingleFlight] = {}
+
+
+def get_shared_flight(name: str) -> SingleFlight:
+    """按名称获取进程内共享的 SingleFlight"""
+    flight = _shared_flights.get(name)
+    if flight is None:
+        flight = _shared_flights[name] = SingleFlight()
+    return flight
@@ -0,0 +1,36 @@
+"""测试公共设置：与 main_cli 一样，把 src 加入 sys.path，并提供不联网的 WeatherAPI"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+import httpx
+import pytest
+
+from tools.weather_api import WeatherAPI
+from utils.cache import TTLCache
+from utils.circuit_breaker import CircuitBreaker
+from utils.geocoding import GeoCache, CityLocation
+
+
+@pytest.fixture
+def make_weather_api():
+    """
+    创建使用独立缓存、熔断器和地理编码缓存的 WeatherAPI
+
+    返回的函数参数：
+        transport: httpx 传输层，或交给 httpx.MockTransport 的请求处理函数
+        known_cities: 名称 -> 城市 ID，预先写入地理编码缓存
+        api_key: 接口密钥
+    """
+    def make(transport, known_cities=None, api_key="test") -> WeatherAPI:
+        if not isinstance(transport, httpx.AsyncBaseTransport):
+            transport = httpx.MockTransport(transport)
+        geocache = GeoCache(":memory:")
+        for name, city_id in (known_cities or {}).items():
+            geocache.put(name, CityLocation(query=name, city_id=city_id))
+        return WeatherAPI(api_key=api_key, cache=TTLCache(), geocache=geocache,
+                          client=httpx.AsyncClient(transport=transport),
+                          breaker=CircuitBreaker("test"))
+    return make
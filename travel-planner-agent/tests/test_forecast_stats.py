@@ -0,0 +1,56 @@
+"""
+forecast_stats 的按天聚合测试
+安装与未安装 numpy 时推荐的日期和得分必须一致
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils import forecast_stats
+from utils.forecast_stats import ScoringModel, best_days
+
+
+def make_slots():
+    conditions = ["晴", "多云", "雨", "晴", "阴", "Clear", "Rain", "多云"]
+    start = datetime(2026, 5, 1, 0, 0)
+    slots = []
+    for i in range(40):
+        temp = 8 + (i * 7) % 20
+        slots.append({
+            "date": start + timedelta(hours=3 * i),
+            "condition": conditions[(i * 3) % len(conditions)],
+            "temperature": temp,
+            "temp_high": temp + 2,
+            "temp_low": temp - 3,
+            "humidity": 30 + (i * 11) % 50
+        })
+    return slots
+
+
+def test_python_path_matches_numpy(monkeypatch):
+    pytest.importorskip("numpy")
+    slots = make_slots()
+    model = ScoringModel()
+
+    with_numpy = best_days(slots, model, top_n=5)
+    monkeypatch.setattr(forecast_stats, "np", None)
+    without_numpy = best_days(slots, model, top_n=5)
+
+    assert without_numpy == with_numpy
+    assert len({item["date"] for item in with_numpy}) == 5
+
+
+def test_dominant_condition_ties_go_to_first_seen(monkeypatch):
+    day = datetime(2026, 5, 1, 0, 0)
+    slots = [
+        {"date": day + timedelta(hours=3 * i), "condition": c, "temperature": 20, "humidity": 50}
+        for i, c in enumerate(["多云", "晴", "晴", "多云", "雨"])
+    ]
+    monkeypatch.setattr(forecast_stats, "np", None)
+
+    result = best_days(slots, ScoringModel(), top_n=3)
+
+    assert len(result) == 1
+    assert result[0]["weather"]["condition"] == "多云"
+    assert result[0]["weather"]["slots"] == 5
@@ -0,0 +1,107 @@
+"""
+录制/回放传输层测试
+录制时由 httpx.MockTransport 充当 OpenWeatherMap，回放时任何上游请求都会让测试失败
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from utils.http_client import ClientRegistry
+from utils.replay_transport import RECORD, REPLAY, FixtureNotFound, ReplayTransport, replay_wrapper
+
+CITY_ID = 1850147
+
+
+def forecast_payload(count):
+    return {
+        "city": {"id": CITY_ID, "name": "Tokyo", "country": "JP", "coord": {"lat": 35.7, "lon": 139.7}},
+        "list": [
+            {
+                "dt": 1_780_000_000 + 10800 * i,
+                "main": {"temp": 18 + i % 5, "temp_max": 20 + i % 5, "temp_min": 15 + i % 5,
+                         "humidity": 55, "pressure": 1012},
+                "weather": [{"main": "Clear" if i % 3 else "Clouds", "description": "晴"}],
+                "wind": {"speed": 2.5}
+            }
+            for i in range(count)
+        ]
+    }
+
+
+def recording_server(calls):
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        return httpx.Response(200, json=forecast_payload(int(request.url.params["cnt"])))
+    return handler
+
+
+def offline_server(request: httpx.Request) -> httpx.Response:
+    pytest.fail(f"回放时不应访问上游: {request.url}")
+
+
+def test_record_then_replay_without_network(tmp_path, make_weather_api):
+    calls = []
+    recorder = ReplayTransport(str(tmp_path), httpx.MockTransport(recording_server(calls)), mode=RECORD)
+    api = make_weather_api(recorder, {"东京": CITY_ID}, api_key="record-key")
+    recorded = asyncio.run(api.get_forecast("东京", days=2))
+
+    assert recorded["source"] == "OpenWeatherMap"
+    assert recorder.stats() == {"replayed": 0, "recorded": 1, "missing": 0}
+    assert calls == ["/data/2.5/forecast"]
+    # 密钥不写入磁盘
+    assert "record-key" not in "".join(p.read_text(encoding="utf-8") for p in tmp_path.iterdir())
+
+    # 密钥不参与请求键，换一个密钥也能命中录制
+    player = ReplayTransport(str(tmp_path), httpx.MockTransport(offline_server), mode=REPLAY)
+    api = make_weather_api(player, {"东京": CITY_ID}, api_key="other-key")
+    replayed = asyncio.run(api.get_forecast("东京", days=2))
+
+    assert replayed == recorded
+    assert player.stats() == {"replayed": 1, "recorded": 0, "missing": 0}
+    assert calls == ["/data/2.5/forecast"]
+
+
+def test_replay_without_recording_fails_loudly(tmp_path):
+    player = ReplayTransport(str(tmp_path), httpx.MockTransport(offline_server), mode=REPLAY)
+
+    async def request():
+        async with httpx.AsyncClient(transport=player) as client:
+            await client.get("https://api.openweathermap.org/data/2.5/weather", params={"id": CITY_ID})
+
+    with pytest.raises(FixtureNotFound, match="没有录制的响应"):
+        asyncio.run(request())
+    assert player.stats()["missing"] == 1
+
+
+def test_switching_wrapper_closes_previous_clients(tmp_path):
+    registry = ClientRegistry()
+
+    async def run():
+        before = registry.get("weather")
+        registry.set_transport_wrapper(replay_wrapper(str(tmp_path)))
+        after = registry.get("weather")
+        assert after is not before and not before.is_closed
+        await registry.aclose()
+        return before, after
+
+    before, after = asyncio.run(run())
+    assert before.is_closed and after.is_closed
+
+
+def test_weather_api_surfaces_missing_fixture(tmp_path, make_weather_api):
+    player = ReplayTransport(str(tmp_path), httpx.MockTransport(offline_server), mode=REPLAY)
+    api = make_weather_api(player, {"东京": CITY_ID})
+
+    # 不能退回模拟数据，也不能计入熔断失败率
+    for _ in range(api.breaker.min_calls + 1):
+        with pytest.raises(FixtureNotFound):
+            asyncio.run(api.get_forecast("东京", days=2))
+    with pytest.raises(FixtureNotFound):
+        asyncio.run(api.get_weather("东京"))
+    with pytest.raises(FixtureNotFound):
+        asyncio.run(api.get_weather_many(["东京"]))
+
+    assert api.breaker_state()["state"] == "closed"
+    assert player.stats()["missing"] == api.breaker.min_calls + 3
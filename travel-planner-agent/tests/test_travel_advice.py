@@ -0,0 +1,28 @@
+"""
+WeatherAPI.get_travel_advice 的测试
+接口不可用时旅行建议与 get_weather 的模拟数据一致
+"""
+
+import asyncio
+
+import httpx
+
+
+def unavailable(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(503)
+
+
+def test_mock_advice_matches_get_weather(make_weather_api):
+    api = make_weather_api(unavailable)
+
+    async def run():
+        return await api.get_weather("东京"), await api.get_travel_advice("东京", days=7)
+
+    weather, advice = asyncio.run(run())
+
+    assert weather.source == advice["weather"].source == "Mock"
+    assert advice["forecast"]["source"] == "Mock"
+    assert advice["weather"].temperature == weather.temperature == 15
+    assert (advice["weather"].temp_high, advice["weather"].temp_low) == (weather.temp_high, weather.temp_low)
+    assert advice["weather"].condition == weather.condition
+    assert not any("较冷" in tip for tip in advice["tips"])
@@ -0,0 +1,144 @@
+"""
+WeatherAPI.get_weather_many 的批量查询测试
+用 httpx.MockTransport 代替 OpenWeatherMap，不访问网络
+"""
+
+import asyncio
+from urllib.parse import parse_qs
+
+import httpx
+
+from tools.weather_api import GROUP_CHUNK_SIZE, GROUP_CONCURRENCY
+from utils.geocoding import CityLocation
+
+
+def city_item(city_id, name):
+    return {
+        "id": city_id,
+        "name": name,
+        "main": {"temp": 20, "temp_max": 22, "temp_min": 18, "humidity": 50, "pressure": 1013},
+        "weather": [{"main": "Clear", "description": "晴"}],
+        "wind": {"speed": 1.0}
+    }
+
+
+class FakeOpenWeatherMap:
+    """记录请求并统计同时进行的请求数"""
+
+    def __init__(self, group_status=200, delay=0.02):
+        self.group_status = group_status
+        self.delay = delay
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            params = {k: v[0] for k, v in parse_qs(request.url.query.decode()).items()}
+            self.requests.append((request.url.path, params))
+
+            if request.url.path.endswith("/group"):
+                if self.group_status != 200:
+                    return httpx.Response(self.group_status)
+                ids = [int(i) for i in params["id"].split(",")]
+                return httpx.Response(200, json={"list": [city_item(i, f"城市{i}") for i in ids]})
+
+            if "id" in params:
+                city_id = int(params["id"])
+                return httpx.Response(200, json=city_item(city_id, f"城市{city_id}"))
+            return httpx.Response(200, json=city_item(9000, params["q"]))
+        finally:
+            self.active -= 1
+
+    def paths(self, suffix):
+        return [params for path, params in self.requests if path.endswith(suffix)]
+
+
+def city_names(ids):
+    return {f"城市{city_id}": city_id for city_id in ids}
+
+
+def test_group_chunks_concurrency_and_order(make_weather_api):
+    known = list(range(1000, 1100))
+    unknown = ["未知甲", "未知乙", "未知丙"]
+    cities = [f"城市{i}" for i in known[:50]] + unknown + [f"城市{i}" for i in known[50:]]
+    server = FakeOpenWeatherMap()
+    api = make_weather_api(server, city_names(known))
+
+    results = asyncio.run(api.get_weather_many(cities))
+
+    groups = server.paths("/group")
+    assert len(groups) == 5
+    assert all(len(params["id"].split(",")) <= GROUP_CHUNK_SIZE for params in groups)
+    sent_ids = sorted(int(i) for params in groups for i in params["id"].split(","))
+    assert sent_ids == known
+
+    # 5 个 group 批次 + 3 个按名称查询，同时进行的请求数被限制在 GROUP_CONCURRENCY
+    assert server.max_active == GROUP_CONCURRENCY
+    assert [weather.city for weather in results] == cities
+
+    # 未知城市逐个按名称查询
+    by_name = server.paths("/weather")
+    assert sorted(params["q"] for params in by_name) == sorted(unknown)
+    assert all(weather.source == "OpenWeatherMap" for weather in results)
+
+
+def test_failed_group_falls_back_to_single_city_requests(make_weather_api):
+    known = [1001, 1002, 1003]
+    server = FakeOpenWeatherMap(group_status=500)
+    api = make_weather_api(server, city_names(known))
+    cities = ["城市1003", "城市1001", "城市1002"]
+
+    results = asyncio.run(api.get_weather_many(cities))
+
+    assert len(server.paths("/group")) == 1
+    assert sorted(int(params["id"]) for params in server.paths("/weather")) == known
+    assert [weather.city for weather in results] == cities
+    assert all(weather.source == "OpenWeatherMap" for weather in results)
+
+
+def test_cached_cities_send_no_requests(make_weather_api):
+    known = [1001, 1002]
+    server = FakeOpenWeatherMap()
+    api = make_weather_api(server, city_names(known))
+    cities = ["城市1001", "城市1002"]
+
+    asyncio.run(api.get_weather_many(cities))
+    sent = len(server.requests)
+    asyncio.run(api.get_weather_many(cities))
+
+    assert len(server.requests) == sent
+    stats = api.cache_stats()
+    assert (stats["hits"], stats["misses"]) == (2, 2)
+
+
+def test_aliases_sharing_a_city_id(make_weather_api):
+    known = [1001, 1002]
+    server = FakeOpenWeatherMap()
+    api = make_weather_api(server, city_names(known))
+    api.geocache.put("东京别名", CityLocation(query="东京别名", city_id=1001))
+    cities = ["城市1001", "东京别名", "城市1002", "城市1001"]
+
+    results = asyncio.run(api.get_weather_many(cities))
+
+    groups = server.paths("/group")
+    assert len(groups) == 1
+    assert sorted(int(i) for i in groups[0]["id"].split(",")) == known
+    # 城市名取自接口响应，别名得到的是同一个城市的天气
+    assert [weather.city for weather in results] == ["城市1001", "城市1001", "城市1002", "城市1001"]
+    assert all(weather.source == "OpenWeatherMap" for weather in results)
+
+
+def test_aliases_fall_back_when_group_fails(make_weather_api):
+    server = FakeOpenWeatherMap(group_status=500)
+    api = make_weather_api(server, city_names([1001]))
+    api.geocache.put("东京别名", CityLocation(query="东京别名", city_id=1001))
+    cities = ["东京别名", "城市1001"]
+
+    results = asyncio.run(api.get_weather_many(cities))
+
+    assert [int(params["id"]) for params in server.paths("/weather")] == [1001, 1001]
+    assert [weather.city for weather in results] == ["城市1001", "城市1001"]